@@ -11,6 +11,11 @@ class HealthResponse(BaseModel):
     """Response model for health check endpoint."""
     status: str
 
+class DocumentationResponse(BaseModel):
+    """Response model for the synthesis documentation endpoint."""
+    documentation: str
+    summary: str
+
 class ErrorResponse(BaseModel):
     """Standard error response model."""
     detail: str
@@ -18,6 +23,6 @@ class ErrorResponse(BaseModel):
 class SynthesisResponse:
     """Response class for synthesis endpoint (streaming)."""
     # This is a marker class for API documentation
-    # The actual response is a StreamingResponse with audio/wav content
-    # and custom headers for documentation and summary
+    # The actual response is a StreamingResponse with audio/wav content;
+    # the Documentation-Location header points at the documentation endpoint
     pass
\ No newline at end of file
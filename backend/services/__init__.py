@@ -1,4 +1,5 @@
 from . import tts
 from . import code_processor
+from . import audio_cache
 
-__all__ = ["tts", "code_processor"]
\ No newline at end of file
+__all__ = ["tts", "code_processor", "audio_cache"]
\ No newline at end of file
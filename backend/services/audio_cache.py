@@ -0,0 +1,119 @@
+import os
+import struct
+import hashlib
+import tempfile
+import threading
+from typing import AsyncGenerator, AsyncIterable, Callable, Iterator, Optional
+
+# Cache location and capacity (number of cached clips)
+CACHE_DIR = os.getenv("TTS_CACHE_DIR", os.path.join(tempfile.gettempdir(), "tts_cache"))
+MAX_ENTRIES = int(os.getenv("TTS_CACHE_SIZE", "128"))
+CHUNK_SIZE = 64 * 1024
+
+# The directory itself is the LRU index: hits bump a clip's mtime and eviction
+# drops the oldest files, so clips from earlier runs and other workers count too
+_lock = threading.Lock()
+
+def cache_key(summary: str, model_id: str) -> str:
+    """Build the cache key for a summary rendered with a given TTS model."""
+    return hashlib.sha256(f"{model_id}|{summary}".encode()).hexdigest()
+
+def _path(key: str) -> str:
+    return os.path.join(CACHE_DIR, f"{key}.wav")
+
+def _evict():
+    """Delete the least recently used clips beyond MAX_ENTRIES."""
+    with _lock:
+        try:
+            entries = [entry for entry in os.scandir(CACHE_DIR) if entry.name.endswith(".wav")]
+        except OSError:
+            return
+        if len(entries) <= MAX_ENTRIES:
+            return
+        
+        def mtime(entry):
+            try:
+                return entry.stat().st_mtime
+            except OSError:
+                return 0.0
+        
+        entries.sort(key=mtime)
+        for entry in entries[:len(entries) - MAX_ENTRIES]:
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
+
+def _read_chunks(f) -> Iterator[bytes]:
+    # One reusable read buffer; each yielded chunk is a single copy out of it
+    buffer = bytearray(CHUNK_SIZE)
+    view = memoryview(buffer)
+    with f:
+        while True:
+            n = f.readinto(buffer)
+            if not n:
+                break
+            yield bytes(view[:n])
+
+def get(key: str) -> Optional[Iterator[bytes]]:
+    """Return the audio chunks of a cached clip, or None on a miss."""
+    wav_path = _path(key)
+    try:
+        # Open eagerly so a concurrent eviction can't pull the file away mid-stream
+        audio_file = open(wav_path, "rb")
+    except OSError:
+        return None
+    
+    try:
+        # Mark as recently used
+        os.utime(wav_path)
+    except OSError:
+        pass
+    return _read_chunks(audio_file)
+
+def _finalize_wav_header(f, path: str, size: int):
+    """Fill in the real sizes of a WAV that was streamed with placeholder sizes."""
+    if size < 44:
+        return
+    f.flush()
+    with open(path, "rb") as r:
+        header = r.read(44)
+    if header[:4] == b"RIFF" and header[36:40] == b"data" and header[40:44] == b"\xff\xff\xff\xff":
+        f.seek(4)
+        f.write(struct.pack("<I", size - 8))
+        f.seek(40)
+        f.write(struct.pack("<I", size - 44))
+
+async def tee(
+    key: str,
+    audio_stream: AsyncIterable[bytes],
+    publish: Optional[Callable[[], bool]] = None
+) -> AsyncGenerator[bytes, None]:
+    """Pass audio_stream through unchanged while writing it to the cache.
+    
+    publish, if given, is checked once the stream ends; the clip is only
+    cached when it returns True.
+    """
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    fd, part_path = tempfile.mkstemp(dir=CACHE_DIR, suffix=".part")
+    complete = False
+    size = 0
+    
+    try:
+        with os.fdopen(fd, "wb") as f:
+            async for chunk in audio_stream:
+                f.write(chunk)
+                size += len(chunk)
+                yield chunk
+            _finalize_wav_header(f, part_path, size)
+        complete = True
+    finally:
+        # Only publish fully streamed, non-empty clips the producer vouches for
+        if complete and size and (publish is None or publish()):
+            try:
+                os.replace(part_path, _path(key))
+                _evict()
+            except OSError as e:
+                print(f"Audio cache write failed: {e}")
+        if os.path.exists(part_path):
+            os.remove(part_path)
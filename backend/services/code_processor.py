@@ -1,25 +1,192 @@
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional, Tuple
+import io
 import os
 import re
+import ast
+import json
+import time
+import queue
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
 from fastapi import HTTPException
 import google.generativeai as genai
 
-def generate_documentation(code: str) -> Dict[str, str]:
-    """Generate documentation and summary using Gemini API."""
+# Documentation cache: in-process LRU, persisted as JSON for reuse across restarts
+DOC_CACHE_DIR = os.getenv("DOC_CACHE_DIR", ".doc_cache")
+DOC_CACHE_SIZE = 256
+
+_DOC_CACHE: "OrderedDict[str, Dict[str, str]]" = OrderedDict()
+_DOC_CACHE_LOCK = threading.Lock()
+
+# Patterns used by the rule-based analyzer, compiled once at import
+_FUNC_RE = re.compile(r'def\s+(\w+)\s*\([^)]*\):')
+_CLASS_RE = re.compile(r'class\s+(\w+)[\(\:]')
+_PATTERN_RE = re.compile(
+    r'(?P<print>print\()|(?P<import>^\s*(?:import|from)\s)|(?P<main>if\s+__name__)',
+    re.M
+)
+
+# Bit flags for the patterns above
+_HAS_PRINT = 1
+_HAS_IMPORT = 2
+_HAS_MAIN = 4
+_PATTERN_FLAGS = {"print": _HAS_PRINT, "import": _HAS_IMPORT, "main": _HAS_MAIN}
+_ALL_PATTERNS = _HAS_PRINT | _HAS_IMPORT | _HAS_MAIN
+
+# Documentation note and summary phrase for each detected pattern, in output order
+_PATTERN_NOTES = [
+    (_HAS_PRINT, "Contains print statements", "output operations"),
+    (_HAS_IMPORT, "Imports external modules", "module imports"),
+    (_HAS_MAIN, "Contains main execution block", "main execution"),
+]
+
+def _doc_cache_key(code: str, source: str) -> str:
+    """Cache key for code documented by a given source (gemini, local)."""
+    digest = hashlib.blake2b(code.encode(), digest_size=16).hexdigest()
+    return f"{source}-{digest}"
+
+def _doc_cache_get(key: str) -> Optional[Dict[str, str]]:
+    with _DOC_CACHE_LOCK:
+        if key in _DOC_CACHE:
+            _DOC_CACHE.move_to_end(key)
+            return dict(_DOC_CACHE[key])
+    
+    path = os.path.join(DOC_CACHE_DIR, f"{key}.json")
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            result = json.load(f)
+        # Mark as recently used for _doc_cache_prune
+        os.utime(path)
+    except (OSError, ValueError):
+        return None
     
-    # Get Gemini API key
-    api_key = os.getenv("GEMINI_API_KEY")
+    _doc_cache_remember(key, result)
+    return dict(result)
+
+def _doc_cache_remember(key: str, result: Dict[str, str]):
+    with _DOC_CACHE_LOCK:
+        _DOC_CACHE[key] = dict(result)
+        _DOC_CACHE.move_to_end(key)
+        while len(_DOC_CACHE) > DOC_CACHE_SIZE:
+            _DOC_CACHE.popitem(last=False)
+
+def _doc_cache_prune():
+    """Keep at most DOC_CACHE_SIZE files on disk, dropping the least recently used."""
+    entries = []
+    for entry in os.scandir(DOC_CACHE_DIR):
+        if entry.name.endswith(".json"):
+            try:
+                entries.append((entry.stat().st_mtime, entry.path))
+            except OSError:
+                pass
+    entries.sort()
+    for _, path in entries[:max(0, len(entries) - DOC_CACHE_SIZE)]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+def _doc_cache_put(key: str, result: Dict[str, str]):
+    _doc_cache_remember(key, result)
+    try:
+        os.makedirs(DOC_CACHE_DIR, exist_ok=True)
+        path = os.path.join(DOC_CACHE_DIR, f"{key}.json")
+        with open(f"{path}.part", "w", encoding="utf-8") as f:
+            json.dump(result, f)
+        os.replace(f"{path}.part", path)
+        _doc_cache_prune()
+    except OSError as e:
+        print(f"Documentation cache write failed: {e}")
+
+# Gemini models keyed by API key digest, each bound to its own API client
+GEMINI_CLIENT_CACHE_SIZE = 16
+_GEMINI_MODELS: "OrderedDict[str, Any]" = OrderedDict()
+_GEMINI_LOCK = threading.Lock()
+
+_JSON_OBJECT_RE = re.compile(r'\{.*\}', re.S)
+_SENTENCE_END_RE = re.compile(r'(?<=[.!?])\s+')
+
+def _new_gemini_model(api_key: str):
+    """Build a Gemini model that always sends api_key, whatever genai.configure() says."""
+    from google.ai import generativelanguage as glm
+    
+    model = genai.GenerativeModel('gemini-pro')
+    # GenerativeModel otherwise binds to the process-wide default client on its first
+    # call, which genai.configure() rewrites for every key (_client is why requirements.txt pins 0.8.*)
+    model._client = glm.GenerativeServiceClient(client_options={"api_key": api_key})
+    return model
+
+def _get_gemini_model(api_key: str):
+    """Return the shared Gemini model for api_key, creating it on first use."""
+    key = hashlib.blake2b(api_key.encode(), digest_size=16).hexdigest()
+    with _GEMINI_LOCK:
+        if key not in _GEMINI_MODELS:
+            _GEMINI_MODELS[key] = _new_gemini_model(api_key)
+            while len(_GEMINI_MODELS) > GEMINI_CLIENT_CACHE_SIZE:
+                _GEMINI_MODELS.popitem(last=False)
+        _GEMINI_MODELS.move_to_end(key)
+        return _GEMINI_MODELS[key]
+
+def get_client(api_key: Optional[str] = None):
+    """Return the shared Gemini model for api_key (default GEMINI_API_KEY), or None without a key."""
+    api_key = api_key or os.getenv("GEMINI_API_KEY")
     if not api_key:
+        return None
+    return _get_gemini_model(api_key)
+
+def ensure_client(api_key: Optional[str] = None) -> bool:
+    """Create the Gemini client ahead of the first request; False if no key is configured."""
+    return get_client(api_key) is not None
+
+def _parse_gemini_response(text: str) -> Dict[str, str]:
+    """Extract documentation and summary from Gemini's JSON reply."""
+    documentation = summary = ""
+    match = _JSON_OBJECT_RE.search(text)
+    try:
+        data = json.loads(match.group()) if match else {}
+    except ValueError:
+        data = {}
+    
+    if isinstance(data, dict):
+        documentation = data.get("documentation", "")
+        summary = data.get("summary", "")
+        if not isinstance(documentation, str):
+            documentation = json.dumps(documentation, indent=2)
+        if not isinstance(summary, str):
+            summary = str(summary)
+    
+    # Not valid JSON: treat the whole reply as documentation
+    if not documentation.strip():
+        documentation = text
+    if not summary.strip():
+        summary = " ".join(_SENTENCE_END_RE.split(documentation.strip())[:2])
+    
+    return {
+        "documentation": documentation.strip(),
+        "summary": summary.strip()
+    }
+
+def generate_documentation(code: str, client=None) -> Dict[str, str]:
+    """Generate documentation and summary using Gemini API.
+    
+    client is a Gemini model from get_client(); by default one is built from GEMINI_API_KEY.
+    """
+    
+    model = client or get_client()
+    if model is None:
         print("Gemini API key not found, using rule-based approach")
         return generate_documentation_rule_based(code)
     
+    cache_key = _doc_cache_key(code, "gemini")
+    cached = _doc_cache_get(cache_key)
+    if cached is not None:
+        return cached
+    
     try:
-        # Configure Gemini
-        genai.configure(api_key=api_key)
-        model = genai.GenerativeModel('gemini-pro')
-        
-        # Generate documentation
-        documentation_prompt = f"""
+        # Ask for documentation and summary together: one round trip per request
+        prompt = f"""
         Analyze the following Python code and generate comprehensive documentation:
 
         Code:
@@ -27,86 +194,175 @@ def generate_documentation(code: str) -> Dict[str, str]:
         {code}
         ```
 
-        Please provide:
-        1. Overview of what the code does
-        2. Function descriptions with parameters and return values
-        3. Class descriptions with attributes and methods
-        4. Important patterns or algorithms used
-        5. Dependencies and imports explained
-
-        Format the response in a clear, structured way.
+        Respond with only a JSON object with two string fields:
+        - "documentation": documentation in a clear, structured way, covering
+          1. Overview of what the code does
+          2. Function descriptions with parameters and return values
+          3. Class descriptions with attributes and methods
+          4. Important patterns or algorithms used
+          5. Dependencies and imports explained
+        - "summary": a concise 2-3 sentence summary of the documentation that would be suitable for text-to-speech
         """
         
-        doc_response = model.generate_content(documentation_prompt)
-        documentation = doc_response.text
+        response = model.generate_content(prompt)
+        result = _parse_gemini_response(response.text)
+        _doc_cache_put(cache_key, result)
+        return result
         
-        # Generate summary of the documentation
-        summary_prompt = f"""
-        Based on this documentation, provide a concise 2-3 sentence summary that would be suitable for text-to-speech:
-
-        Documentation:
-        {documentation}
+    except Exception as e:
+        print(f"Gemini API error: {e}, falling back to rule-based approach")
+        return generate_documentation_rule_based(code)
 
-        Summary:
-        """
-        
-        summary_response = model.generate_content(summary_prompt)
-        summary = summary_response.text
-        
-        return {
-            "documentation": documentation.strip(),
-            "summary": summary.strip()
-        }
+def _generate_field_with_gemini(code: str, field: str, prompt: str, client=None, fallback: bool = True) -> str:
+    """Run a single-field Gemini prompt ("summary" or "documentation") for code.
+    
+    With fallback=False a Gemini error is raised instead of being replaced by
+    the rule-based text, so callers that memoize results can skip caching it.
+    """
+    
+    model = client or get_client()
+    if model is None:
+        print("Gemini API key not found, using rule-based approach")
+        return generate_documentation_rule_based(code)[field]
+    
+    # Reuse either a split result or a combined generate_documentation result
+    for source in (f"gemini-{field}", "gemini"):
+        cached = _doc_cache_get(_doc_cache_key(code, source))
+        if cached is not None and field in cached:
+            return cached[field]
+    
+    try:
+        text = model.generate_content(prompt).text.strip()
+        _doc_cache_put(_doc_cache_key(code, f"gemini-{field}"), {field: text})
+        return text
         
     except Exception as e:
+        if not fallback:
+            raise
         print(f"Gemini API error: {e}, falling back to rule-based approach")
-        return generate_documentation_rule_based(code)
+        return generate_documentation_rule_based(code)[field]
+
+def generate_summary(code: str, client=None, fallback: bool = True) -> str:
+    """Generate a short, speakable summary of code using Gemini API."""
+    prompt = f"""
+    Provide a concise 2-3 sentence summary of what the following Python code does, suitable for text-to-speech:
+
+    Code:
+    ```python
+    {code}
+    ```
+
+    Summary:
+    """
+    return _generate_field_with_gemini(code, "summary", prompt, client, fallback)
+
+def generate_full_documentation(code: str, client=None, fallback: bool = True) -> str:
+    """Generate full documentation for code using Gemini API."""
+    prompt = f"""
+    Analyze the following Python code and generate comprehensive documentation:
+
+    Code:
+    ```python
+    {code}
+    ```
+
+    Please provide:
+    1. Overview of what the code does
+    2. Function descriptions with parameters and return values
+    3. Class descriptions with attributes and methods
+    4. Important patterns or algorithms used
+    5. Dependencies and imports explained
+
+    Format the response in a clear, structured way.
+    """
+    return _generate_field_with_gemini(code, "documentation", prompt, client, fallback)
+
+def _is_main_guard(test: ast.expr) -> bool:
+    """True for an `if __name__ == "__main__"` style condition."""
+    if not isinstance(test, ast.Compare):
+        return False
+    operands = [test.left, *test.comparators]
+    return any(isinstance(op, ast.Name) and op.id == "__name__" for op in operands)
+
+def _analyze_code_ast(code: str) -> Tuple[List[str], List[str], int]:
+    """Collect functions, classes and pattern flags from a single AST walk."""
+    tree = ast.parse(code)
+    functions, classes = [], []
+    flags = 0
+    
+    for node in ast.walk(tree):
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            functions.append((node.lineno, node.col_offset, node.name))
+        elif isinstance(node, ast.ClassDef):
+            classes.append((node.lineno, node.col_offset, node.name))
+        elif isinstance(node, (ast.Import, ast.ImportFrom)):
+            flags |= _HAS_IMPORT
+        elif isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id == "print":
+            flags |= _HAS_PRINT
+        elif isinstance(node, ast.If) and _is_main_guard(node.test):
+            flags |= _HAS_MAIN
+    
+    # ast.walk is breadth-first; report definitions in source order
+    return (
+        [name for _, _, name in sorted(functions)],
+        [name for _, _, name in sorted(classes)],
+        flags
+    )
+
+def _analyze_code_regex(code: str) -> Tuple[List[str], List[str], int]:
+    """Regex-based fallback for code that does not parse."""
+    functions = _FUNC_RE.findall(code)
+    classes = _CLASS_RE.findall(code)
+    
+    # Scan once for prints, imports and a main block
+    flags = 0
+    for match in _PATTERN_RE.finditer(code):
+        flags |= _PATTERN_FLAGS[match.lastgroup]
+        if flags == _ALL_PATTERNS:
+            break
+    
+    return functions, classes, flags
 
 def generate_documentation_rule_based(code: str) -> Dict[str, str]:
     """Generate documentation and summary using simple rule-based approach (no API required)."""
     
-    # Simple rule-based documentation generation
-    documentation_lines = []
-    summary_parts = []
+    # Extract function/class definitions and common patterns
+    try:
+        functions, classes, flags = _analyze_code_ast(code)
+    except (SyntaxError, ValueError, RecursionError):
+        # Not parseable (partial snippet, other language): fall back to regexes
+        functions, classes, flags = _analyze_code_regex(code)
     
-    # Extract function definitions
-    functions = re.findall(r'def\s+(\w+)\s*\([^)]*\):', code)
-    classes = re.findall(r'class\s+(\w+)[\(\:]', code)
+    # Build the documentation in one buffer; each section after the
+    # first is preceded by a blank line
+    doc = io.StringIO()
+    summary_parts = []
     
     if functions:
-        documentation_lines.append("Functions:")
+        doc.write("Functions:")
         for func in functions:
-            documentation_lines.append(f"  - {func}(): Function defined")
+            doc.write(f"\n  - {func}(): Function defined")
             summary_parts.append(f"function {func}")
     
     if classes:
-        documentation_lines.append("\nClasses:")
+        doc.write("\n\nClasses:" if doc.tell() else "\nClasses:")
         for cls in classes:
-            documentation_lines.append(f"  - {cls}: Class defined")
+            doc.write(f"\n  - {cls}: Class defined")
             summary_parts.append(f"class {cls}")
     
     # Look for common patterns
-    if "print(" in code:
-        documentation_lines.append("\n- Contains print statements")
-        summary_parts.append("output operations")
-    
-    if "import " in code or "from " in code:
-        documentation_lines.append("\n- Imports external modules")
-        summary_parts.append("module imports")
-    
-    if "if __name__" in code:
-        documentation_lines.append("\n- Contains main execution block")
-        summary_parts.append("main execution")
+    for flag, note, summary_part in _PATTERN_NOTES:
+        if flags & flag:
+            doc.write("\n\n- " if doc.tell() else "\n- ")
+            doc.write(note)
+            summary_parts.append(summary_part)
     
     # Generate documentation
-    if not documentation_lines:
-        documentation = "Code analysis complete. No specific functions or classes detected."
-    else:
-        documentation = "\n".join(documentation_lines)
+    documentation = doc.getvalue() or "Code analysis complete. No specific functions or classes detected."
     
     # Generate summary
     if summary_parts:
-        summary = f"This code contains {', '.join(summary_parts)}."
+        summary = "This code contains " + ", ".join(summary_parts) + "."
     else:
         summary = "This is a Python code snippet."
     
@@ -115,66 +371,248 @@ def generate_documentation_rule_based(code: str) -> Dict[str, str]:
         "summary": summary
     }
 
+# Local documentation models, loaded once per process and shared by all requests
+_MODEL_CACHE: Dict[str, tuple] = {}
+_MODEL_LOCK = threading.Lock()
+
+# Precision for local documentation models: auto, fp32, fp16 or bf16
+DOC_MODEL_PRECISION = os.getenv("DOC_MODEL_PRECISION", "auto")
+
+def _model_dtype(device: str):
+    """Pick the weight dtype for local documentation models on device."""
+    import torch
+    
+    precision = DOC_MODEL_PRECISION.lower()
+    if precision == "auto":
+        # T5 activations overflow in fp16, so auto only picks bf16, and only
+        # on GPUs with native support (CPU bf16 is emulated without AMX)
+        if device == "cuda" and torch.cuda.is_bf16_supported():
+            return torch.bfloat16
+        return torch.float32
+    return {
+        "fp32": torch.float32,
+        "fp16": torch.float16,
+        "bf16": torch.bfloat16,
+    }.get(precision, torch.float32)
+
+# Local model runtime: "onnx" (int8 ONNX Runtime on CPU, needs optimum), "torch",
+# or "auto" (torch on CUDA hosts so the GPU/bf16 path is kept, onnx otherwise)
+DOC_MODEL_BACKEND = os.getenv("DOC_MODEL_BACKEND", "auto")
+ONNX_MODEL_DIR = os.getenv("DOC_ONNX_MODEL_DIR", "models")
+
+def _use_onnx_backend() -> bool:
+    """Whether local models should run on ONNX Runtime rather than PyTorch."""
+    backend = DOC_MODEL_BACKEND.lower()
+    if backend == "auto":
+        try:
+            import torch
+        except ImportError:
+            return True
+        return not torch.cuda.is_available()
+    return backend == "onnx"
+
+def _load_onnx_model(model_name: str):
+    """Load an int8 ONNX export of model_name, exporting and quantizing it on first use."""
+    import shutil
+    import tempfile
+    from optimum.onnxruntime import ORTModelForSeq2SeqLM, ORTQuantizer
+    from optimum.onnxruntime.configuration import AutoQuantizationConfig
+    
+    quantized_dir = os.path.join(ONNX_MODEL_DIR, f"{model_name.split('/')[-1]}-int8")
+    if not os.path.isdir(quantized_dir):
+        print(f"Exporting {model_name} to int8 ONNX in {quantized_dir}")
+        qconfig = AutoQuantizationConfig.avx512_vnni(is_static=False, per_channel=False)
+        with tempfile.TemporaryDirectory() as export_dir:
+            exported = ORTModelForSeq2SeqLM.from_pretrained(model_name, export=True, use_merged=False)
+            exported.save_pretrained(export_dir)
+            building_dir = f"{quantized_dir}.part"
+            shutil.rmtree(building_dir, ignore_errors=True)
+            os.makedirs(building_dir)
+            for file_name in os.listdir(export_dir):
+                if file_name.endswith(".onnx"):
+                    quantizer = ORTQuantizer.from_pretrained(export_dir, file_name=file_name)
+                    quantizer.quantize(save_dir=building_dir, quantization_config=qconfig)
+                elif os.path.isfile(os.path.join(export_dir, file_name)):
+                    # Model and generation configs
+                    shutil.copy(os.path.join(export_dir, file_name), building_dir)
+            os.replace(building_dir, quantized_dir)
+    
+    return ORTModelForSeq2SeqLM.from_pretrained(
+        quantized_dir,
+        encoder_file_name="encoder_model_quantized.onnx",
+        decoder_file_name="decoder_model_quantized.onnx",
+        decoder_with_past_file_name="decoder_with_past_model_quantized.onnx",
+        provider="CPUExecutionProvider"
+    )
+
+def _load_torch_model(model_name: str, model_class):
+    """Load model_name with PyTorch on the best available device."""
+    import torch
+    
+    model = model_class.from_pretrained(model_name)
+    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+    model.eval()
+    model.to(device=device, dtype=_model_dtype(device.type))
+    return model
+
+def _get_model(model_name: str, model_class):
+    """Return the cached (tokenizer, model) pair for model_name, loading it on first use."""
+    with _MODEL_LOCK:
+        if model_name not in _MODEL_CACHE:
+            from transformers import T5Tokenizer
+            
+            tokenizer = T5Tokenizer.from_pretrained(model_name)
+            model = None
+            if _use_onnx_backend():
+                try:
+                    model = _load_onnx_model(model_name)
+                except ImportError:
+                    print("optimum[onnxruntime] not installed, using PyTorch")
+                except Exception as e:
+                    print(f"ONNX Runtime load failed for {model_name}, using PyTorch: {e}")
+            if model is None:
+                model = _load_torch_model(model_name, model_class)
+            _MODEL_CACHE[model_name] = (tokenizer, model)
+        return _MODEL_CACHE[model_name]
+
+def _to_device(tensor, device):
+    """Move an input tensor to device, staging through pinned memory for GPUs."""
+    if device.type == "cuda":
+        # Pinned host memory makes the copy asynchronous with respect to the host
+        return tensor.pin_memory().to(device, non_blocking=True)
+    return tensor.to(device)
+
+# Local documentation models in order of preference (FLAN-T5 is better for
+# instructions). FLAN-T5 checkpoints use the regular T5 architecture class.
+_LOCAL_MODELS = [
+    ("google/flan-t5-small", "FLAN-T5 Small"),
+    ("t5-small", "T5 Small"),
+    ("google/flan-t5-base", "FLAN-T5 Base"),
+]
+_FAILED_MODELS = set()
+
+def _get_local_model():
+    """Return (tokenizer, model) for the first local model that loads."""
+    from transformers import T5ForConditionalGeneration
+    
+    for model_name, display_name in _LOCAL_MODELS:
+        if model_name in _FAILED_MODELS:
+            continue
+        try:
+            return _get_model(model_name, T5ForConditionalGeneration)
+        except Exception as e:
+            print(f"Failed to load {display_name}: {e}")
+            _FAILED_MODELS.add(model_name)
+    
+    raise RuntimeError("No local documentation model could be loaded")
+
+def _generate_batch(prompts: List[str]) -> List[str]:
+    """Run one padded model.generate call over a batch of prompts."""
+    import torch
+    
+    tokenizer, model = _get_local_model()
+    inputs = tokenizer(prompts, return_tensors="pt", padding=True, max_length=512, truncation=True)
+    
+    # Greedy decoding: deterministic and cheaper than sampling
+    with torch.inference_mode():
+        outputs = model.generate(
+            input_ids=_to_device(inputs.input_ids, model.device),
+            attention_mask=_to_device(inputs.attention_mask, model.device),
+            max_new_tokens=128,
+            num_beams=1,
+            do_sample=False,
+            pad_token_id=tokenizer.eos_token_id
+        )
+    
+    return tokenizer.batch_decode(outputs, skip_special_tokens=True)
+
+# Micro-batching window for concurrent local model requests
+BATCH_MAX_SIZE = 8
+BATCH_WINDOW = 0.02  # seconds
+
+class _LocalModelBatcher:
+    """Coalesce prompts submitted from concurrent requests into one generate call."""
+    
+    def __init__(self):
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker = None
+    
+    def submit(self, prompt: str) -> Future:
+        future = Future()
+        self._queue.put((prompt, future))
+        with self._lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name="local-doc-batcher", daemon=True)
+                self._worker.start()
+        return future
+    
+    def _run(self):
+        while True:
+            # Wait for the first prompt, then gather more for up to BATCH_WINDOW
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + BATCH_WINDOW
+            while len(batch) < BATCH_MAX_SIZE:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+            
+            try:
+                texts = _generate_batch([prompt for prompt, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+            else:
+                for (_, future), text in zip(batch, texts):
+                    future.set_result(text)
+
+_batcher = _LocalModelBatcher()
+
+# Characters of code given to local models (~1000 T5 tokens); longer code keeps
+# its head and tail so the tokenizer never sees the whole file
+LOCAL_MODEL_MAX_CODE_CHARS = 4000
+
+def _truncate_code(code: str, limit: int = LOCAL_MODEL_MAX_CODE_CHARS) -> str:
+    """Shorten code to about limit characters, keeping its beginning and end."""
+    if len(code) <= limit:
+        return code
+    half = limit // 2
+    return code[:half] + "\n...\n" + code[-half:]
+
 def generate_documentation_with_local_model(code: str) -> Dict[str, str]:
     """Generate documentation using local open-source models (T5/FLAN-T5)."""
+    cache_key = _doc_cache_key(code, "local")
+    cached = _doc_cache_get(cache_key)
+    if cached is not None:
+        return cached
+    
     try:
-        from transformers import T5ForConditionalGeneration, T5Tokenizer, FlanT5ForConditionalGeneration
-        import torch
+        # Prepare prompt for documentation generation
+        prompt = f"Generate documentation and summary for this Python code:\n\n{_truncate_code(code)}\n\nDocumentation:"
+        generated_text = _batcher.submit(prompt).result()
         
-        # Try FLAN-T5 first (better for instructions), then T5
-        models_to_try = [
-            ("google/flan-t5-small", FlanT5ForConditionalGeneration, "FLAN-T5 Small"),
-            ("t5-small", T5ForConditionalGeneration, "T5 Small"),
-            ("google/flan-t5-base", FlanT5ForConditionalGeneration, "FLAN-T5 Base"),
-        ]
+        # Clean up the generated text
+        if "Documentation:" in generated_text:
+            generated_text = generated_text.split("Documentation:", 1)[1].strip()
         
-        for model_name, model_class, display_name in models_to_try:
-            try:
-                print(f"Trying {display_name}...")
-                tokenizer = T5Tokenizer.from_pretrained(model_name)
-                model = model_class.from_pretrained(model_name)
-                
-                # Prepare prompt for documentation generation
-                prompt = f"Generate documentation and summary for this Python code:\n\n{code}\n\nDocumentation:"
-                
-                inputs = tokenizer(prompt, return_tensors="pt", max_length=512, truncation=True)
-                
-                with torch.no_grad():
-                    outputs = model.generate(
-                        inputs.input_ids,
-                        max_length=200,
-                        num_return_sequences=1,
-                        temperature=0.7,
-                        do_sample=True,
-                        pad_token_id=tokenizer.eos_token_id
-                    )
-                
-                generated_text = tokenizer.decode(outputs[0], skip_special_tokens=True)
-                
-                # Clean up the generated text
-                if "Documentation:" in generated_text:
-                    generated_text = generated_text.split("Documentation:", 1)[1].strip()
-                
-                # Split into documentation and summary
-                lines = generated_text.split('\n')
-                documentation = '\n'.join(lines).strip()
-                summary = lines[0] if lines else generated_text[:100] + "..."
-                
-                if len(summary) > 150:
-                    summary = summary[:147] + "..."
-                
-                return {
-                    "documentation": documentation or "Documentation generated successfully.",
-                    "summary": summary or "Code documentation summary."
-                }
-                
-            except Exception as e:
-                print(f"Failed to load {display_name}: {e}")
-                continue
+        # Split into documentation and summary
+        lines = generated_text.split('\n')
+        documentation = '\n'.join(lines).strip()
+        summary = lines[0] if lines else generated_text[:100] + "..."
         
-        # If all models fail, fallback to rule-based
-        print("All models failed, using rule-based approach")
-        return generate_documentation_rule_based(code)
+        if len(summary) > 150:
+            summary = summary[:147] + "..."
+        
+        result = {
+            "documentation": documentation or "Documentation generated successfully.",
+            "summary": summary or "Code documentation summary."
+        }
+        _doc_cache_put(cache_key, result)
+        return result
         
     except ImportError:
         # transformers not available, fallback to rule-based
@@ -182,4 +620,4 @@ def generate_documentation_with_local_model(code: str) -> Dict[str, str]:
         return generate_documentation_rule_based(code)
     except Exception as e:
         print(f"Error with local models: {e}, using rule-based approach")
-        return generate_documentation_rule_based(code)
\ No newline at end of file
+        return generate_documentation_rule_based(code)
@@ -1,151 +1,663 @@
 import os
 import io
-import wave
-import struct
+import re
 import math
 import asyncio
-from typing import AsyncGenerator
+import time
+import struct
+import functools
+import queue
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import AsyncGenerator, Dict, Iterator, List, Optional, Tuple
+import httpx
 from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
 import warnings
-from TTS.api import TTS
-from pydub import AudioSegment
-from pathlib import Path
-import torch
+
+# CPU threads for model inference, split between uvicorn workers so BLAS/OpenMP
+# pools don't oversubscribe the cores; must be set before torch/numpy load
+TTS_NUM_THREADS = int(os.getenv(
+    "TTS_NUM_THREADS",
+    str(max(1, (os.cpu_count() or 1) // max(1, int(os.getenv("WORKERS", "1")))))
+))
+os.environ.setdefault("OMP_NUM_THREADS", str(TTS_NUM_THREADS))
+os.environ.setdefault("MKL_NUM_THREADS", str(TTS_NUM_THREADS))
+
+import numpy as np
 
 # Suppress all warnings
 warnings.filterwarnings("ignore")
 
+__all__ = [
+    "VALID_CHARS",
+    "clean_text",
+    "split_text",
+    "synthesize_batch",
+    "text_to_intermediate_audio",
+    "generate_simple_audio",
+    "split_sentences",
+    "cached_audio",
+    "pcm_to_wav",
+    "wav_to_opus",
+    "stream_tts_audio_sync",
+    "stream_tts_audio_iter",
+    "stream_tts_audio",
+    "stream_tts_audio_huggingface",
+    "clear_audio_cache",
+    "ensure_model_loaded",
+]
+
 # Define valid vocabulary (alphanumeric + basic punctuation)
-VALID_CHARS = set("abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789 .,?!")
+VALID_CHARS = frozenset("abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789 .,?!")
+
+# torch and Coqui TTS load on first synthesis, so deployments that only
+# serve the simple fallback never import them
+_torch_configured = False
+_TORCH_LOCK = threading.Lock()
+
+def _import_torch():
+    """Import torch, applying the inference thread settings the first time."""
+    global _torch_configured
+    import torch
+    
+    if not _torch_configured:
+        with _TORCH_LOCK:
+            if not _torch_configured:
+                torch.set_num_threads(TTS_NUM_THREADS)
+                try:
+                    torch.set_num_interop_threads(int(os.getenv("TTS_NUM_INTEROP_THREADS", "1")))
+                except RuntimeError:
+                    # Only allowed before torch has started any parallel work
+                    pass
+                _torch_configured = True
+    return torch
+
+@functools.lru_cache(maxsize=None)
+def _device() -> str:
+    """Device for synthesis (GPU if available, else CPU)."""
+    return "cuda" if _import_torch().cuda.is_available() else "cpu"
+
+# Autocast precision for GPU synthesis: fp32 (off), fp16 or bf16; CPU always runs fp32
+TTS_PRECISION = os.getenv("TTS_PRECISION", "fp32").lower()
+
+def _autocast_dtype():
+    if _device() != "cuda":
+        return None
+    torch = _import_torch()
+    return {"fp16": torch.float16, "bf16": torch.bfloat16}.get(TTS_PRECISION)
+
+# Replay the vocoder from captured CUDA graphs (opt-in, GPU only, fp32 only)
+TTS_CUDA_GRAPHS = os.getenv("TTS_CUDA_GRAPHS", "").lower() in ("1", "true", "yes")
+
+def _use_cuda_graphs(device: str, enabled: Optional[bool] = None, precision: Optional[str] = None) -> bool:
+    """Whether to capture the vocoder in CUDA graphs on device.
+    
+    Graphs are refused under fp16/bf16 autocast: capture would run inside
+    _synthesize's autocast, whose cast-weight copies are freed when the
+    context exits, so later replays would read freed memory.
+    """
+    enabled = TTS_CUDA_GRAPHS if enabled is None else enabled
+    precision = TTS_PRECISION if precision is None else precision
+    if not enabled or device != "cuda":
+        return False
+    if precision in ("fp16", "bf16"):
+        print(f"TTS_CUDA_GRAPHS ignored with TTS_PRECISION={precision}; running the vocoder eagerly")
+        return False
+    return True
 
-# Set device (GPU if available, else CPU)
-device = "cuda" if torch.cuda.is_available() else "cpu"
+class _CudaGraphVocoder:
+    """Wrap a vocoder's inference() to replay CUDA graphs captured per mel-length bucket.
+    
+    Tacotron2's decoder stops at a data-dependent step, so only the vocoder,
+    a fixed-shape convolution stack, can be captured. Mels are padded up to
+    the next bucket and the output is cut back to the original length; longer
+    mels run eagerly.
+    """
+    
+    BUCKETS = (128, 256, 512, 1024, 2048)
+    
+    def __init__(self, inference):
+        self._inference = inference
+        self._graphs = {}
+        self._lock = threading.Lock()
+    
+    def _capture(self, channels: int, frames: int, like):
+        torch = _import_torch()
+        static_in = torch.zeros((1, channels, frames), device=like.device, dtype=like.dtype)
+        # Warm up on a side stream so allocations settle before capture
+        stream = torch.cuda.Stream()
+        stream.wait_stream(torch.cuda.current_stream())
+        with torch.cuda.stream(stream):
+            for _ in range(3):
+                self._inference(static_in)
+        torch.cuda.current_stream().wait_stream(stream)
+        
+        graph = torch.cuda.CUDAGraph()
+        with torch.cuda.graph(graph):
+            static_out = self._inference(static_in)
+        return graph, static_in, static_out
+    
+    def __call__(self, mel, *args, **kwargs):
+        frames = mel.shape[-1]
+        bucket = next((b for b in self.BUCKETS if b >= frames), None)
+        if args or kwargs or mel.dim() != 3 or mel.shape[0] != 1 or bucket is None:
+            return self._inference(mel, *args, **kwargs)
+        
+        torch = _import_torch()
+        with self._lock:
+            key = (mel.shape[1], bucket, mel.dtype)
+            if key not in self._graphs:
+                self._graphs[key] = self._capture(mel.shape[1], bucket, mel)
+            graph, static_in, static_out = self._graphs[key]
+            # Repeat the last frame rather than padding with zeros, which aren't silence in a log-mel
+            static_in.copy_(torch.nn.functional.pad(mel, (0, bucket - frames), mode="replicate"))
+            graph.replay()
+            keep = static_out.shape[-1] * frames // bucket
+            return static_out[..., :keep].clone()
+
+# Loaded TTS models keyed by (model_name, device), shared across requests
+TTS_MODEL_NAME = "tts_models/en/ljspeech/tacotron2-DDC"
+_TTS_CACHE: Dict[Tuple[str, str], "TTS"] = {}
+_TTS_LOCK = threading.Lock()
+
+def _get_tts(model_name: str = TTS_MODEL_NAME) -> "TTS":
+    """Return the shared TTS instance for model_name, loading it on first use."""
+    device = _device()
+    key = (model_name, device)
+    tts = _TTS_CACHE.get(key)
+    if tts is None:
+        with _TTS_LOCK:
+            tts = _TTS_CACHE.get(key)
+            if tts is None:
+                from TTS.api import TTS
+                
+                tts = TTS(model_name=model_name, progress_bar=False).to(device)
+                vocoder = getattr(tts.synthesizer, "vocoder_model", None)
+                if vocoder is not None and _use_cuda_graphs(device):
+                    vocoder.inference = _CudaGraphVocoder(vocoder.inference)
+                _TTS_CACHE[key] = tts
+    return tts
+
+def ensure_model_loaded(model_id: str = "local") -> bool:
+    """Load the TTS model model_id synthesizes with ahead of the first request.
+    
+    Returns False when model_id doesn't use the model or it can't be loaded.
+    """
+    if model_id in _PRODUCERS:
+        return False
+    try:
+        _get_tts()
+        return True
+    except Exception as e:
+        print(f"TTS model warm-up failed: {e}")
+        return False
+
+class _CleanTable(dict):
+    """str.translate table that maps every character missing from it to a space."""
+    
+    def __missing__(self, key):
+        return ' '
+
+# Valid characters map to themselves; everything else falls through to a space
+_CLEAN_TABLE = _CleanTable((ord(c), c) for c in VALID_CHARS)
+
+# Same character set as VALID_CHARS, for text with non-ASCII characters
+_INVALID_CHARS_RE = re.compile(r'[^A-Za-z0-9 .,?!]')
 
 # Clean text by replacing invalid characters with spaces
 def clean_text(text):
-    return ''.join(c if c in VALID_CHARS else ' ' for c in text)
+    # translate is fastest while it stays on CPython's ASCII fast path; once
+    # non-ASCII characters appear the regex substitution wins
+    if text.isascii():
+        return text.translate(_CLEAN_TABLE)
+    return _INVALID_CHARS_RE.sub(' ', text)
 
 # Split text into chunks for TTS processing
 def split_text(text, max_length=1000):
     words = text.split()
-    chunks = []
-    current_chunk = []
-    current_length = 0
+    limit = max(max_length - 1, 1)
+    if any(len(word) > limit for word in words):
+        # Break up words that can't fit in a chunk on their own
+        words = [word[i:i + limit] for word in words for i in range(0, len(word), limit)]
+    if not words:
+        return []
     
-    for word in words:
-        if current_length + len(word) + 1 <= max_length:
-            current_chunk.append(word)
-            current_length += len(word) + 1
-        else:
-            chunks.append(" ".join(current_chunk))
-            current_chunk = [word]
-            current_length = len(word) + 1
-    if current_chunk:
-        chunks.append(" ".join(current_chunk))
+    # Running length of the words so far, each counted with its trailing space
+    lengths = np.fromiter((len(word) + 1 for word in words), dtype=np.int64, count=len(words))
+    ends = np.cumsum(lengths)
+    
+    chunks = []
+    start = 0
+    while start < len(words):
+        offset = ends[start - 1] if start else 0
+        end = max(int(np.searchsorted(ends, offset + max_length, side='right')), start + 1)
+        chunks.append(" ".join(words[start:end]))
+        start = end
     
     return chunks
 
-# Convert text to intermediate audio
-def text_to_intermediate_audio(text, temp_output_base="temp_audio", output_dir="temp"):
-    """Convert text to audio using TTS model."""
+def _wav_header(sample_rate: int, n_samples: Optional[int] = None) -> bytes:
+    """Build a 44-byte mono 16-bit PCM WAV header.
+    
+    Without n_samples the sizes are left at their maximum, the usual marker
+    for a WAV stream whose final length isn't known yet.
+    """
+    data_size = 0xFFFFFFFF if n_samples is None else n_samples * 2
+    riff_size = 0xFFFFFFFF if n_samples is None else 36 + data_size
+    return struct.pack(
+        '<4sI4s4sIHHIIHH4sI',
+        b'RIFF', riff_size, b'WAVE',
+        b'fmt ', 16, 1, 1, sample_rate, sample_rate * 2, 2, 16,
+        b'data', data_size
+    )
+
+def pcm_to_wav(pcm: bytes, sample_rate: int) -> bytes:
+    """Wrap mono 16-bit PCM in a WAV container."""
+    return _wav_header(sample_rate, len(pcm) // 2) + bytes(pcm)
+
+# Sample rates the Opus encoder accepts
+_OPUS_SAMPLE_RATES = (8000, 12000, 16000, 24000, 48000)
+
+def wav_to_opus(wav: bytes) -> Optional[bytes]:
+    """Re-encode a WAV as Ogg/Opus for playback, or None if no Opus encoder is available."""
     try:
-        os.makedirs(output_dir, exist_ok=True)
-        tts = TTS(model_name="tts_models/en/ljspeech/tacotron2-DDC", progress_bar=False, gpu=(device == "cuda"))
-        chunks = split_text(text)
-        temp_files = []
-        
-        for i, chunk in enumerate(chunks):
-            temp_file = f"{output_dir}/{temp_output_base}_{i}.wav"
-            tts.tts_to_file(text=chunk, file_path=temp_file)
-            temp_files.append(temp_file)
-        
-        # Combine audio chunks
-        combined = AudioSegment.empty()
-        for temp_file in temp_files:
-            combined += AudioSegment.from_file(temp_file)
-            os.remove(temp_file)
+        import soundfile as sf
         
-        combined_output = f"{output_dir}/{temp_output_base}.wav"
-        combined.export(combined_output, format="wav")
-        
-        # Read the final audio file and return bytes
-        with open(combined_output, 'rb') as f:
-            audio_bytes = f.read()
-        
-        # Clean up
-        os.remove(combined_output)
-        if os.path.exists(output_dir) and not os.listdir(output_dir):
-            os.rmdir(output_dir)
-        
-        return audio_bytes
+        samples, sample_rate = sf.read(io.BytesIO(wav), dtype='float32')
+        if sample_rate not in _OPUS_SAMPLE_RATES:
+            # Resample up to the nearest rate Opus supports (22050 Hz -> 24000 Hz)
+            from scipy.signal import resample_poly
+            
+            target = next((r for r in _OPUS_SAMPLE_RATES if r >= sample_rate), _OPUS_SAMPLE_RATES[-1])
+            g = math.gcd(target, sample_rate)
+            samples = resample_poly(samples, target // g, sample_rate // g).astype(np.float32)
+            sample_rate = target
         
+        buffer = io.BytesIO()
+        sf.write(buffer, samples, sample_rate, format='OGG', subtype='OPUS')
+        return buffer.getvalue()
     except Exception as e:
-        print(f"TTS error: {e}")
-        # Fallback to simple tone generation
-        return generate_simple_audio(text)
+        print(f"Opus encoding failed: {e}")
+        return None
+
+def _to_pcm16(wave: np.ndarray) -> np.ndarray:
+    """Convert a float waveform in [-1, 1] to little-endian 16-bit PCM samples."""
+    # WAV data is little-endian regardless of the host byte order
+    return (wave * 32767).clip(-32768, 32767).astype('<i2')
+
+def _synthesize(tts: "TTS", text: str) -> np.ndarray:
+    """Run the model on one chunk of text and return its float waveform."""
+    torch = _import_torch()
+    dtype = _autocast_dtype()
+    with torch.inference_mode(), torch.autocast(device_type="cuda", dtype=dtype, enabled=dtype is not None):
+        return np.asarray(tts.tts(text=text), dtype=np.float32)
+
+_SENTENCE_END_RE = re.compile(r'(?<=[.?!])\s+')
+
+def split_sentences(text, max_length=1000):
+    """Split text into sentences, further split to at most max_length characters."""
+    chunks = []
+    for sentence in _SENTENCE_END_RE.split(text):
+        chunks.extend(split_text(sentence, max_length))
+    return chunks
+
+def _synthesize_distinct(texts: List[str], model_name: str = TTS_MODEL_NAME) -> Dict[str, object]:
+    """Map each distinct text to its 16-bit PCM, or to the exception its synthesis raised."""
+    tts = _get_tts(model_name)
+    results: Dict[str, object] = {}
+    for text in texts:
+        if text not in results:
+            try:
+                results[text] = _to_pcm16(_synthesize(tts, text)).tobytes()
+            except Exception as e:
+                results[text] = e
+    return results
+
+def synthesize_batch(texts: List[str], model_name: str = TTS_MODEL_NAME) -> List[bytes]:
+    """Synthesize 16-bit PCM for each text with one model, running each distinct text once."""
+    results = _synthesize_distinct(texts, model_name)
+    for result in results.values():
+        if isinstance(result, Exception):
+            raise result
+    return [results[text] for text in texts]
+
+# Micro-batching window for concurrent synthesis requests
+BATCH_MAX_SIZE = 8
+BATCH_WINDOW = 0.02  # seconds
+
+class _TTSBatcher:
+    """Run all model synthesis on one thread, coalescing texts submitted together.
+    
+    Coqui's Tacotron2 decoder keeps per-call state on the model, so a shared
+    model must not run concurrently; the batcher serializes access and lets
+    identical sentences from concurrent requests share one synthesis.
+    """
+    
+    def __init__(self):
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker = None
+    
+    def submit(self, text: str, model_name: str = TTS_MODEL_NAME) -> Future:
+        future = Future()
+        self._queue.put((text, model_name, future))
+        with self._lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name="tts-batcher", daemon=True)
+                self._worker.start()
+        return future
+    
+    def _run(self):
+        while True:
+            # Wait for the first text, then gather more for up to BATCH_WINDOW
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + BATCH_WINDOW
+            while len(batch) < BATCH_MAX_SIZE:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+            
+            by_model: Dict[str, list] = {}
+            for text, model_name, future in batch:
+                by_model.setdefault(model_name, []).append((text, future))
+            for model_name, items in by_model.items():
+                try:
+                    results = _synthesize_distinct([text for text, _ in items], model_name)
+                except Exception as e:
+                    # The model itself failed to load: nothing in the group can run
+                    for _, future in items:
+                        future.set_exception(e)
+                    continue
+                # A text that fails only fails its own futures
+                for text, future in items:
+                    result = results[text]
+                    if isinstance(result, Exception):
+                        future.set_exception(result)
+                    else:
+                        future.set_result(result)
+
+_batcher = _TTSBatcher()
+
+# Convert text to intermediate audio
+def text_to_intermediate_audio(text):
+    """Convert text to audio using TTS model; raises if the model is unavailable."""
+    tts = _get_tts()
+    futures = [_batcher.submit(chunk) for chunk in split_text(text)]
+    return pcm_to_wav(b"".join(future.result() for future in futures), tts.synthesizer.output_sample_rate)
+
+def _stream_intermediate_audio(text, status: Optional[Dict[str, bool]] = None) -> Iterator[bytes]:
+    """Return an iterator of WAV pieces, synthesizing one chunk per piece.
+    
+    The model is loaded before returning so a missing model raises here,
+    while a fallback is still possible. Once the header is out, a chunk that
+    fails is replaced by fallback tones so the stream stays a valid WAV.
+    """
+    tts = _get_tts()
+    sample_rate = tts.synthesizer.output_sample_rate
+    
+    def pieces():
+        yield _wav_header(sample_rate)
+        # Sentence-sized pieces get the first audio out sooner
+        chunks = split_sentences(text)
+        for chunk, future in zip(chunks, [_batcher.submit(chunk) for chunk in chunks]):
+            try:
+                yield future.result()
+            except Exception as e:
+                print(f"TTS error (_stream_intermediate_audio): {e}")
+                if status is not None:
+                    status["fallback"] = True
+                yield _simple_samples_at(chunk, sample_rate).tobytes()
+    
+    return pieces()
+
+# Fallback tone audio: 100ms of one tone per character at 22050 Hz
+SIMPLE_SAMPLE_RATE = 22050  # Hz
+_TONE_SAMPLES = int(SIMPLE_SAMPLE_RATE * 0.1)
+
+# Every character's samples, precomputed: row 0 is silence (spaces), rows 1-26
+# are the 220-720 Hz tones characters map to
+_TONE_TABLE = (32767 * 0.3 * np.sin(
+    2 * np.pi * np.outer(
+        np.concatenate(([0.0], 200.0 + np.arange(1, 27) * 20.0)),
+        np.arange(_TONE_SAMPLES) / SIMPLE_SAMPLE_RATE
+    )
+)).astype('<i2')
+
+def _simple_samples(text: str) -> np.ndarray:
+    """Build the fallback tone samples for text."""
+    # Generate a simple tone pattern based on text: A-Z mapped to 1-26,
+    # silence for spaces
+    codes = np.frombuffer(text.lower().encode("utf-32-le"), dtype="<u4")
+    rows = np.where(codes == ord(' '), 0, codes % 26 + 1)
+    return _TONE_TABLE[rows].ravel()
+
+def _simple_samples_at(text: str, sample_rate: int) -> np.ndarray:
+    """Fallback tone samples for text at sample_rate."""
+    samples = _simple_samples(text)
+    if sample_rate != SIMPLE_SAMPLE_RATE:
+        # Nearest-sample resampling is plenty for tones
+        positions = np.arange(len(samples) * sample_rate // SIMPLE_SAMPLE_RATE)
+        samples = samples[positions * SIMPLE_SAMPLE_RATE // sample_rate]
+    return samples
 
 def generate_simple_audio(text: str) -> bytes:
     """Generate simple audio as fallback."""
     try:
         # Create a simple mono WAV file
-        sample_rate = 22050  # Hz
-        duration = min(len(text) * 0.1, 5.0)  # 0.1 seconds per character, max 5 seconds
-        
-        # Generate a simple tone pattern based on text
-        audio_samples = []
-        for i, char in enumerate(text):
-            if char == ' ':
-                # Silence for spaces
-                freq = 0
-            else:
-                # Different frequency for different characters
-                char_code = ord(char.lower()) % 26 + 1  # A-Z mapped to 1-26
-                freq = 200 + (char_code * 20)  # 200-720 Hz range
-            
-            # Generate samples for this character
-            char_duration = 0.1  # 100ms per character
-            char_samples = int(sample_rate * char_duration)
-            
-            for j in range(char_samples):
-                if freq == 0:
-                    # Silence
-                    sample = 0
-                else:
-                    # Simple sine wave
-                    t = j / sample_rate
-                    sample = int(32767 * 0.3 * math.sin(2 * math.pi * freq * t))
-                audio_samples.append(sample)
+        sample_rate = SIMPLE_SAMPLE_RATE
+        audio_samples = _simple_samples(text)
         
-        # Convert to WAV format
-        wav_buffer = io.BytesIO()
-        
-        with wave.open(wav_buffer, 'wb') as wav_file:
-            wav_file.setnchannels(1)  # Mono
-            wav_file.setsampwidth(2)  # 16-bit
-            wav_file.setframerate(sample_rate)
-            
-            # Pack samples into bytes
-            packed_samples = struct.pack('<' + 'h' * len(audio_samples), *audio_samples)
-            wav_file.writeframes(packed_samples)
-        
-        wav_buffer.seek(0)
-        return wav_buffer.getvalue()
+        # Convert to WAV format: 16-bit samples behind a hand-built header
+        return _wav_header(sample_rate, len(audio_samples)) + audio_samples.tobytes()
         
     except Exception as e:
         print(f"Simple audio generation failed: {e}")
         return b""
 
+# Sync producers tried in order for each model_id; anything else uses the TTS model
+_PRODUCERS = {
+    "simple": [generate_simple_audio],
+}
+_DEFAULT_PRODUCERS = [text_to_intermediate_audio, generate_simple_audio]
+
+# Size of the pieces stream_tts_audio yields
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# Recently synthesized clips keyed by (text, model_id), oldest first; repeated
+# summaries (reruns, health checks) return the same bytes without resynthesis
+AUDIO_CACHE_SIZE = 32
+_AUDIO_CACHE: "OrderedDict[Tuple[str, str], bytes]" = OrderedDict()
+_AUDIO_CACHE_LOCK = threading.Lock()
+
+def cached_audio(text: str, model_id: str = "local") -> Optional[bytes]:
+    """Return the cached WAV for text and model_id, or None if it isn't cached."""
+    with _AUDIO_CACHE_LOCK:
+        audio_bytes = _AUDIO_CACHE.get((text, model_id))
+        if audio_bytes is not None:
+            _AUDIO_CACHE.move_to_end((text, model_id))
+        return audio_bytes
+
+def _remember_audio(text: str, model_id: str, audio_bytes: bytes):
+    with _AUDIO_CACHE_LOCK:
+        _AUDIO_CACHE[(text, model_id)] = audio_bytes
+        _AUDIO_CACHE.move_to_end((text, model_id))
+        while len(_AUDIO_CACHE) > AUDIO_CACHE_SIZE:
+            _AUDIO_CACHE.popitem(last=False)
+
+def clear_audio_cache():
+    """Drop cached stream_tts_audio_sync results."""
+    with _AUDIO_CACHE_LOCK:
+        _AUDIO_CACHE.clear()
+
 def stream_tts_audio_sync(text: str, model_id: str = "local") -> bytes:
     """Synchronous version of TTS audio generation for Streamlit."""
+    audio_bytes = cached_audio(text, model_id)
+    if audio_bytes is not None:
+        return audio_bytes
+    
     # Clean the text first
     cleaned_text = clean_text(text)
     
-    # Use the intermediate audio function
-    audio_bytes = text_to_intermediate_audio(cleaned_text)
+    producers = _PRODUCERS.get(model_id, _DEFAULT_PRODUCERS)
+    for producer in producers:
+        try:
+            audio_bytes = producer(cleaned_text)
+            if audio_bytes:
+                # Fallback output isn't cached, so a model that recovers is used
+                if producer is producers[0]:
+                    _remember_audio(text, model_id, audio_bytes)
+                return audio_bytes
+        except Exception as e:
+            print(f"TTS error ({producer.__name__}): {e}")
+    
+    return b""
+
+def stream_tts_audio_iter(text: str, model_id: str = "local", status: Optional[Dict[str, bool]] = None,
+                          remember: bool = True) -> Iterator[Tuple[int, bytes]]:
+    """Yield (sample_rate, 16-bit PCM) pieces for text, one sentence at a time.
+    
+    A sentence that fails to synthesize is replaced by fallback tones. As with
+    stream_tts_audio, status["fallback"] is set when fallback tones were used.
+    The complete clip is cached like stream_tts_audio_sync results once the
+    last piece has been produced, unless it contains fallback tones or
+    remember=False (for callers that keep their own copy of the clip).
+    """
+    if status is None:
+        status = {}
+    cleaned_text = clean_text(text)
+    pcm = bytearray()
+    
+    jobs = None
+    if model_id not in _PRODUCERS:
+        try:
+            sample_rate = _get_tts().synthesizer.output_sample_rate
+            jobs = [(chunk, _batcher.submit(chunk)) for chunk in split_sentences(cleaned_text)]
+        except Exception as e:
+            print(f"TTS error (stream_tts_audio_iter): {e}")
+            status["fallback"] = True
+    
+    if jobs is None:
+        # Simple tone audio, also the fallback when the model can't be loaded
+        sample_rate = SIMPLE_SAMPLE_RATE
+        pcm += _simple_samples(cleaned_text).tobytes()
+        yield sample_rate, bytes(pcm)
+    else:
+        for chunk, future in jobs:
+            try:
+                piece = future.result()
+            except Exception as e:
+                print(f"TTS error (stream_tts_audio_iter): {e}")
+                status["fallback"] = True
+                piece = _simple_samples_at(chunk, sample_rate).tobytes()
+            pcm += piece
+            yield sample_rate, piece
     
-    return audio_bytes
+    # Fallback tones aren't cached, so a model that recovers is used next time
+    if remember and pcm and not status.get("fallback"):
+        _remember_audio(text, model_id, pcm_to_wav(pcm, sample_rate))
+
+# Hugging Face Inference API, used for hub model ids when a token is configured
+HF_API_URL = "https://api-inference.huggingface.co/models/{model_id}"
+_hf_client: Optional[httpx.AsyncClient] = None
+
+def _get_hf_client() -> httpx.AsyncClient:
+    """Return the shared keep-alive client for the Hugging Face API."""
+    global _hf_client
+    if _hf_client is None:
+        _hf_client = httpx.AsyncClient(timeout=60)
+    return _hf_client
+
+# Seconds a Hugging Face availability check (or failure) is trusted
+HF_HEALTH_TTL = 60
+HF_STATUS_URL = "https://api-inference.huggingface.co/status/{model_id}"
+_hf_health: Dict[str, Tuple[float, bool]] = {}
 
-async def stream_tts_audio(text: str, model_id: str = "local") -> AsyncGenerator[bytes, None]:
-    """Stream TTS audio using TTS model."""
-    audio_bytes = stream_tts_audio_sync(text, model_id)
-    yield audio_bytes
\ No newline at end of file
+def _set_hf_health(model_id: str, healthy: bool):
+    _hf_health[model_id] = (time.monotonic() + HF_HEALTH_TTL, healthy)
+
+async def _hf_healthy(model_id: str) -> bool:
+    """Check whether the API can serve model_id, caching the answer for HF_HEALTH_TTL."""
+    cached = _hf_health.get(model_id)
+    if cached is not None and cached[0] > time.monotonic():
+        return cached[1]
+    
+    headers = {"Authorization": f"Bearer {os.getenv('HUGGINGFACE_API_TOKEN')}"}
+    try:
+        response = await _get_hf_client().get(HF_STATUS_URL.format(model_id=model_id), headers=headers)
+        healthy = response.status_code == 200
+    except httpx.HTTPError as e:
+        print(f"Hugging Face status check failed: {e}")
+        healthy = False
+    _set_hf_health(model_id, healthy)
+    return healthy
+
+def _is_huggingface_model(model_id: str) -> bool:
+    # Hub ids look like "org/name"; Coqui ids start with "tts_models/"
+    return "/" in model_id and not model_id.startswith("tts_models/")
+
+async def stream_tts_audio_huggingface(text: str, model_id: str) -> AsyncGenerator[bytes, None]:
+    """Stream audio for text from a model on the Hugging Face Inference API."""
+    headers = {"Authorization": f"Bearer {os.getenv('HUGGINGFACE_API_TOKEN')}"}
+    url = HF_API_URL.format(model_id=model_id)
+    
+    async with _get_hf_client().stream("POST", url, headers=headers, json={"inputs": text}) as response:
+        if response.status_code != 200:
+            detail = (await response.aread()).decode(errors="replace")
+            raise HTTPException(status_code=502, detail=f"Hugging Face TTS error: {detail}")
+        async for chunk in response.aiter_bytes(STREAM_CHUNK_SIZE):
+            yield chunk
+
+def _slices(data) -> Iterator[bytes]:
+    view = memoryview(data)
+    for start in range(0, len(view), STREAM_CHUNK_SIZE):
+        yield bytes(view[start:start + STREAM_CHUNK_SIZE])
+
+async def stream_tts_audio(text: str, model_id: str = "local", status: Optional[Dict[str, bool]] = None) -> AsyncGenerator[bytes, None]:
+    """Stream TTS audio using TTS model.
+    
+    If status is given, status["fallback"] is set to True when the simple tone
+    audio stands in for a model that failed, so callers can avoid caching it.
+    """
+    if os.getenv("HUGGINGFACE_API_TOKEN") and _is_huggingface_model(model_id) and await _hf_healthy(model_id):
+        # Buffer the whole response so a failure part-way through can still
+        # fall back to local synthesis without mixing two streams
+        audio = bytearray()
+        try:
+            async for chunk in stream_tts_audio_huggingface(text, model_id):
+                audio += chunk
+        except Exception as e:
+            print(f"Hugging Face TTS failed: {e}")
+            _set_hf_health(model_id, False)
+        else:
+            if audio:
+                for chunk in _slices(audio):
+                    yield chunk
+                return
+            print("Hugging Face TTS returned no audio")
+    
+    # Synthesis is CPU/GPU bound; keep it off the event loop
+    if model_id not in _PRODUCERS:
+        # Send each chunk as soon as it is synthesized, behind a streaming header
+        try:
+            pieces = await run_in_threadpool(_stream_intermediate_audio, clean_text(text), status)
+        except Exception as e:
+            print(f"TTS error (_stream_intermediate_audio): {e}")
+        else:
+            while True:
+                piece = await run_in_threadpool(next, pieces, None)
+                if piece is None:
+                    return
+                yield piece
+    
+    # Simple tone audio, also the fallback when the model can't be loaded
+    if status is not None and model_id not in _PRODUCERS:
+        status["fallback"] = True
+    audio_bytes = await run_in_threadpool(stream_tts_audio_sync, text, "simple")
+    for chunk in _slices(audio_bytes):
+        yield chunk
@@ -1,6 +1,7 @@
 import pytest
 import sys
 import os
+import re
 from pathlib import Path
 
 # Add parent directory to path for imports
@@ -10,25 +11,24 @@ from fastapi.testclient import TestClient
 from unittest.mock import patch, MagicMock
 from app import app
 from models import CodeRequest
+from services import audio_cache
 
 client = TestClient(app)
 
-@patch('services.tts.requests.post')
-@patch('services.code_processor.requests.post')
-def test_synthesize_endpoint(mock_hf_api, mock_tts):
-    # Mock Hugging Face T5 response for documentation
-    mock_hf_response = MagicMock()
-    mock_hf_response.status_code = 200
-    mock_hf_response.json.return_value = [
-        {"generated_text": "This function prints hello world to the console.\nIt's a simple demonstration function."}
-    ]
-    mock_hf_api.return_value = mock_hf_response
+@patch('services.tts.stream_tts_audio')
+@patch('services.code_processor.generate_full_documentation')
+@patch('services.code_processor.generate_summary')
+def test_synthesize_endpoint(mock_summary, mock_docs, mock_tts, tmp_path, monkeypatch):
+    monkeypatch.setattr(audio_cache, "CACHE_DIR", str(tmp_path))
+    
+    # Mock documentation generation
+    mock_summary.return_value = "This function prints hello world to the console."
+    mock_docs.return_value = "This function prints hello world to the console.\nIt's a simple demonstration function."
     
     # Mock TTS response
-    mock_tts.return_value.__enter__.return_value = MagicMock(
-        status_code=200,
-        iter_content=lambda chunk_size: [b"fake_audio_data"]
-    )
+    async def fake_stream(text, model_id, status=None):
+        yield b"fake_audio_data"
+    mock_tts.side_effect = fake_stream
     
     response = client.post(
         "/synthesize",
@@ -40,8 +40,60 @@ def test_synthesize_endpoint(mock_hf_api, mock_tts):
     
     assert response.status_code == 200
     assert response.headers["content-type"] == "audio/wav"
-    assert "This function prints hello world" in response.headers["Documentation"]
-    assert "This function prints hello world" in response.headers["Summary"]
+    assert response.content == b"fake_audio_data"
+    
+    # Documentation is served from the sideband endpoint
+    doc_response = client.get(response.headers["Documentation-Location"])
+    assert doc_response.status_code == 200
+    assert "This function prints hello world" in doc_response.json()["documentation"]
+    assert "This function prints hello world" in doc_response.json()["summary"]
+
+@patch('services.tts.stream_tts_audio')
+@patch('services.code_processor.generate_full_documentation')
+@patch('services.code_processor.generate_summary')
+def test_synthesize_serves_cache_hits(mock_summary, mock_docs, mock_tts, tmp_path, monkeypatch):
+    """A repeated summary/model pair is streamed from the audio cache."""
+    monkeypatch.setattr(audio_cache, "CACHE_DIR", str(tmp_path))
+    mock_summary.return_value = "Cached summary."
+    mock_docs.return_value = "Docs"
+    
+    async def fake_stream(text, model_id, status=None):
+        yield b"cached_audio"
+    mock_tts.side_effect = fake_stream
+    
+    payload = {"code": "x = 1", "model_id": "test-model"}
+    first = client.post("/synthesize", json=payload)
+    second = client.post("/synthesize", json=payload)
+    
+    assert first.content == second.content == b"cached_audio"
+    assert mock_tts.call_count == 1
+
+@patch('services.tts.stream_tts_audio')
+@patch('services.code_processor.generate_full_documentation')
+@patch('services.code_processor.generate_summary')
+def test_synthesize_does_not_cache_fallback_audio(mock_summary, mock_docs, mock_tts, tmp_path, monkeypatch):
+    """Fallback tones are streamed but not cached, so a working model is retried."""
+    monkeypatch.setattr(audio_cache, "CACHE_DIR", str(tmp_path))
+    mock_summary.return_value = "Fallback summary."
+    mock_docs.return_value = "Docs"
+    
+    async def fake_stream(text, model_id, status=None):
+        status["fallback"] = True
+        yield b"beep"
+    mock_tts.side_effect = fake_stream
+    
+    payload = {"code": "y = 2", "model_id": "test-model"}
+    first = client.post("/synthesize", json=payload)
+    second = client.post("/synthesize", json=payload)
+    
+    assert first.content == second.content == b"beep"
+    assert mock_tts.call_count == 2
+    assert not any(tmp_path.iterdir())
+
+def test_synthesis_documentation_unknown_id():
+    """Unknown or expired request ids return 404."""
+    response = client.get("/synthesize/doc/does-not-exist")
+    assert response.status_code == 404
 
 def test_health_endpoint():
     """Test the health check endpoint."""
@@ -49,6 +101,16 @@ def test_health_endpoint():
     assert response.status_code == 200
     assert response.json() == {"status": "healthy"}
 
+def test_hashed_stylesheet_is_cached_immutably():
+    """The page links a content-hashed stylesheet served with a long-lived cache header."""
+    page = client.get("/")
+    assert page.headers["Cache-Control"] == "public, max-age=3600"
+    
+    href = re.search(r'href="(/style\.[0-9a-f]{8}\.css)"', page.text).group(1)
+    response = client.get(href)
+    assert response.status_code == 200
+    assert response.headers["Cache-Control"] == "public, max-age=31536000, immutable"
+
 def test_code_request_model():
     """Test CodeRequest model validation."""
     # Valid request
@@ -0,0 +1,125 @@
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add parent directory to path for imports
+sys.path.append(str(Path(__file__).parent.parent))
+
+from services import code_processor
+
+def test_rule_based_finds_nested_and_async_definitions():
+    """Methods, async defs and annotated signatures are all detected."""
+    code = (
+        "import os\n"
+        "class Greeter:\n"
+        "    def greet(self, name: str) -> str:\n"
+        "        print(name)\n"
+        "    async def fetch(self):\n"
+        "        pass\n"
+        "if __name__ == '__main__':\n"
+        "    Greeter().greet('hi')\n"
+    )
+    result = code_processor.generate_documentation_rule_based(code)
+    
+    assert "greet(): Function defined" in result["documentation"]
+    assert "fetch(): Function defined" in result["documentation"]
+    assert "Greeter: Class defined" in result["documentation"]
+    assert result["summary"] == (
+        "This code contains function greet, function fetch, class Greeter, "
+        "output operations, module imports, main execution."
+    )
+
+def test_rule_based_falls_back_for_unparseable_code():
+    """Code with syntax errors still gets regex-based analysis."""
+    result = code_processor.generate_documentation_rule_based("def ok():\n    print(\n")
+    
+    assert "ok(): Function defined" in result["documentation"]
+    assert "output operations" in result["summary"]
+
+def test_rule_based_without_definitions():
+    result = code_processor.generate_documentation_rule_based("x = 1")
+    
+    assert result["documentation"] == "Code analysis complete. No specific functions or classes detected."
+    assert result["summary"] == "This is a Python code snippet."
+
+def test_truncate_code_keeps_head_and_tail():
+    code = "a" * 3000 + "b" * 3000
+    truncated = code_processor._truncate_code(code, limit=4000)
+    
+    assert truncated == "a" * 2000 + "\n...\n" + "b" * 2000
+    assert code_processor._truncate_code("short", limit=4000) == "short"
+
+def test_generate_summary_uses_the_given_client(tmp_path, monkeypatch):
+    """A client passed in is used even when GEMINI_API_KEY isn't set."""
+    class FakeResponse:
+        text = " Prints a greeting. "
+    
+    class FakeClient:
+        def generate_content(self, prompt):
+            return FakeResponse()
+    
+    monkeypatch.delenv("GEMINI_API_KEY", raising=False)
+    monkeypatch.setattr(code_processor, "DOC_CACHE_DIR", str(tmp_path))
+    
+    summary = code_processor.generate_summary("print('client test')", client=FakeClient())
+    
+    assert summary == "Prints a greeting."
+
+def test_gemini_errors_can_be_raised_instead_of_falling_back(tmp_path, monkeypatch):
+    """fallback=False surfaces Gemini errors and leaves nothing in the doc cache."""
+    class FailingClient:
+        def generate_content(self, prompt):
+            raise RuntimeError("quota exceeded")
+    
+    monkeypatch.setattr(code_processor, "DOC_CACHE_DIR", str(tmp_path))
+    code = "print('failing client')"
+    
+    with pytest.raises(RuntimeError):
+        code_processor.generate_summary(code, client=FailingClient(), fallback=False)
+    assert os.listdir(str(tmp_path)) == []
+    
+    summary = code_processor.generate_summary(code, client=FailingClient())
+    assert summary == code_processor.generate_documentation_rule_based(code)["summary"]
+
+def test_gemini_clients_keep_their_own_api_key(monkeypatch):
+    """Each key's requests go out through a client built for that key."""
+    from google.ai import generativelanguage as glm
+    
+    sent = []
+    
+    class FakeServiceClient:
+        def __init__(self, client_options=None, **kwargs):
+            self.api_key = client_options["api_key"]
+        
+        def generate_content(self, request, **kwargs):
+            sent.append((self.api_key, request.model))
+            return glm.GenerateContentResponse(
+                candidates=[{"content": {"parts": [{"text": f"reply for {self.api_key}"}]}}]
+            )
+    
+    monkeypatch.setattr(glm, "GenerativeServiceClient", FakeServiceClient)
+    monkeypatch.setattr(code_processor, "_GEMINI_MODELS", type(code_processor._GEMINI_MODELS)())
+    
+    client_a = code_processor.get_client("KEY-OF-USER-A")
+    client_b = code_processor.get_client("KEY-OF-USER-B")
+    assert client_a is code_processor.get_client("KEY-OF-USER-A")
+    
+    assert client_a.generate_content("hi").text == "reply for KEY-OF-USER-A"
+    assert client_b.generate_content("hi").text == "reply for KEY-OF-USER-B"
+    assert client_a.generate_content("again").text == "reply for KEY-OF-USER-A"
+    assert [key for key, _ in sent] == ["KEY-OF-USER-A", "KEY-OF-USER-B", "KEY-OF-USER-A"]
+
+def test_doc_cache_caps_files_on_disk(tmp_path, monkeypatch):
+    """The on-disk documentation cache is capped like the in-memory one."""
+    monkeypatch.setattr(code_processor, "DOC_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(code_processor, "DOC_CACHE_SIZE", 2)
+    for age, key in enumerate(["newer", "older"]):
+        path = tmp_path / f"{key}.json"
+        path.write_text("{}")
+        os.utime(path, (1000 - age, 1000 - age))
+    
+    code_processor._doc_cache_put("fresh", {"summary": "s"})
+    
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["fresh.json", "newer.json"]
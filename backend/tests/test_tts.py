@@ -0,0 +1,232 @@
+import io
+import os
+import sys
+import wave
+import asyncio
+from pathlib import Path
+from unittest.mock import patch
+
+import httpx
+import numpy as np
+import pytest
+
+# Add parent directory to path for imports
+sys.path.append(str(Path(__file__).parent.parent))
+
+from services import tts, audio_cache
+
+def test_split_text_respects_max_length():
+    text = "alpha beta gamma delta epsilon"
+    chunks = tts.split_text(text, max_length=12)
+    
+    assert chunks == ["alpha beta", "gamma delta", "epsilon"]
+    assert " ".join(chunks) == text
+
+def test_split_text_breaks_oversized_words():
+    chunks = tts.split_text("tiny " + "x" * 25, max_length=10)
+    
+    assert chunks == ["tiny", "x" * 9, "x" * 9, "x" * 7]
+    assert tts.split_text("   ") == []
+
+def test_clean_text_replaces_invalid_characters():
+    assert tts.clean_text("héllo(world)?\n") == "h llo world ? "
+
+def test_streamed_wav_is_finalized_when_cached(tmp_path, monkeypatch):
+    """A WAV streamed with placeholder sizes is cached with its real sizes."""
+    monkeypatch.setattr(audio_cache, "CACHE_DIR", str(tmp_path))
+    pcm = b"\x01\x00" * 100
+    
+    async def stream():
+        yield tts._wav_header(8000)
+        yield pcm
+    
+    async def drain():
+        return b"".join([chunk async for chunk in audio_cache.tee("clip", stream())])
+    
+    streamed = asyncio.run(drain())
+    assert streamed[40:44] == b"\xff\xff\xff\xff"
+    
+    chunks = audio_cache.get("clip")
+    with wave.open(io.BytesIO(b"".join(chunks))) as wav_file:
+        assert wav_file.getframerate() == 8000
+        assert wav_file.readframes(wav_file.getnframes()) == pcm
+
+def test_audio_cache_evicts_clips_from_earlier_runs(tmp_path, monkeypatch):
+    """Clips left by earlier runs or other workers count towards MAX_ENTRIES."""
+    monkeypatch.setattr(audio_cache, "CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(audio_cache, "MAX_ENTRIES", 2)
+    for age, key in enumerate(["newer", "older", "oldest"]):
+        path = tmp_path / f"{key}.wav"
+        path.write_bytes(b"old clip")
+        os.utime(path, (1000 - age, 1000 - age))
+    
+    async def stream():
+        yield b"new clip"
+    
+    async def drain():
+        return [chunk async for chunk in audio_cache.tee("fresh", stream())]
+    
+    asyncio.run(drain())
+    
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["fresh.wav", "newer.wav"]
+    assert b"".join(audio_cache.get("fresh")) == b"new clip"
+    assert audio_cache.get("oldest") is None
+
+def test_huggingface_stream_falls_back_to_local(monkeypatch):
+    """A failing Hugging Face request falls back to local audio."""
+    monkeypatch.setenv("HUGGINGFACE_API_TOKEN", "token")
+    monkeypatch.setattr(tts, "_hf_health", {})
+    monkeypatch.setattr(tts, "_hf_client", httpx.AsyncClient(
+        transport=httpx.MockTransport(
+            lambda request: httpx.Response(200 if "/status/" in request.url.path else 503, text="loading")
+        )
+    ))
+    
+    async def drain():
+        return b"".join([chunk async for chunk in tts.stream_tts_audio("hi", "facebook/fastspeech2-en-ljspeech")])
+    
+    with patch.object(tts, "_stream_intermediate_audio", side_effect=RuntimeError("no model")):
+        audio = asyncio.run(drain())
+    
+    assert audio[:4] == b"RIFF"
+    # The failure is remembered, so the next request skips the API
+    assert tts._hf_health["facebook/fastspeech2-en-ljspeech"][1] is False
+
+def test_stream_tts_audio_iter_caches_the_full_clip():
+    tts.clear_audio_cache()
+    pieces = list(tts.stream_tts_audio_iter("Hello there. Bye", "simple"))
+    
+    assert {rate for rate, _ in pieces} == {tts.SIMPLE_SAMPLE_RATE}
+    cached = tts.cached_audio("Hello there. Bye", "simple")
+    assert cached == tts.pcm_to_wav(b"".join(pcm for _, pcm in pieces), tts.SIMPLE_SAMPLE_RATE)
+    assert tts.stream_tts_audio_sync("Hello there. Bye", "simple") == cached
+
+def test_stream_tts_audio_iter_can_skip_the_cache():
+    tts.clear_audio_cache()
+    pieces = list(tts.stream_tts_audio_iter("Kept elsewhere", "simple", remember=False))
+    
+    assert pieces
+    assert tts.cached_audio("Kept elsewhere", "simple") is None
+
+def test_stream_tts_audio_sync_does_not_cache_fallback_audio():
+    def broken_model(text):
+        raise RuntimeError("no model")
+    
+    tts.clear_audio_cache()
+    with patch.object(tts, "_DEFAULT_PRODUCERS", [broken_model, tts.generate_simple_audio]):
+        audio = tts.stream_tts_audio_sync("Fallback only", "local")
+    
+    assert audio[:4] == b"RIFF"
+    assert tts.cached_audio("Fallback only", "local") is None
+
+def test_stream_tts_audio_iter_does_not_cache_fallback_audio():
+    tts.clear_audio_cache()
+    with patch.object(tts, "_get_tts", side_effect=RuntimeError("no model")):
+        pieces = list(tts.stream_tts_audio_iter("Fallback only", "local"))
+    
+    assert {rate for rate, _ in pieces} == {tts.SIMPLE_SAMPLE_RATE}
+    assert tts.cached_audio("Fallback only", "local") is None
+
+def test_synthesize_batch_runs_each_distinct_sentence_once(monkeypatch):
+    calls = []
+    
+    class FakeTTS:
+        synthesizer = type("Synthesizer", (), {"output_sample_rate": 8000})
+        
+        def tts(self, text):
+            calls.append(text)
+            return [0.5] * len(text)
+    
+    monkeypatch.setattr(tts, "_get_tts", lambda model_name=tts.TTS_MODEL_NAME: FakeTTS())
+    monkeypatch.setattr(tts, "_synthesize", lambda model, text: np.asarray(model.tts(text), dtype=np.float32))
+    pcm = tts.synthesize_batch(["Hi.", "Bye.", "Hi."])
+    
+    assert pcm[0] == pcm[2] == tts._to_pcm16(np.full(3, 0.5, dtype=np.float32)).tobytes()
+    assert calls == ["Hi.", "Bye."]
+    # Submitted texts resolve to the same PCM through the batcher thread
+    assert tts._batcher.submit("Hi.").result(timeout=5) == pcm[0]
+
+def test_batcher_failure_only_affects_the_failing_text(monkeypatch):
+    def fake_synthesize(model, text):
+        if text == "bad":
+            raise ValueError("bad sentence")
+        return np.full(2, 0.5, dtype=np.float32)
+    
+    monkeypatch.setattr(tts, "_get_tts", lambda model_name=tts.TTS_MODEL_NAME: object())
+    monkeypatch.setattr(tts, "_synthesize", fake_synthesize)
+    results = tts._synthesize_distinct(["good", "bad", "good"])
+    
+    assert results["good"] == tts._to_pcm16(np.full(2, 0.5, dtype=np.float32)).tobytes()
+    assert isinstance(results["bad"], ValueError)
+    # Through the batcher the good text still resolves
+    good, bad = tts._batcher.submit("good"), tts._batcher.submit("bad")
+    assert good.result(timeout=5) == results["good"]
+    with pytest.raises(ValueError):
+        bad.result(timeout=5)
+
+def test_stream_pads_failed_sentences_with_fallback_tones(monkeypatch):
+    """A sentence failing after the header is sent still ends in valid PCM."""
+    class FakeTTS:
+        synthesizer = type("Synthesizer", (), {"output_sample_rate": 16000})
+    
+    def fake_synthesize(model, text):
+        if text.startswith("Bad"):
+            raise ValueError("bad sentence")
+        return np.full(4, 0.5, dtype=np.float32)
+    
+    monkeypatch.setattr(tts, "_get_tts", lambda model_name=tts.TTS_MODEL_NAME: FakeTTS())
+    monkeypatch.setattr(tts, "_synthesize", fake_synthesize)
+    status = {}
+    
+    async def drain():
+        return b"".join([chunk async for chunk in tts.stream_tts_audio("Good one. Bad two.", "local", status)])
+    
+    audio = asyncio.run(drain())
+    
+    assert audio[:4] == b"RIFF" and audio[40:44] == b"\xff\xff\xff\xff"
+    tones = tts._simple_samples_at("Bad two.", 16000).tobytes()
+    assert audio[44:] == tts._to_pcm16(np.full(4, 0.5, dtype=np.float32)).tobytes() + tones
+    assert status == {"fallback": True}
+
+def test_stream_iter_pads_failed_sentences_with_fallback_tones(monkeypatch):
+    """A failing sentence yields fallback tones instead of raising, and isn't cached."""
+    class FakeTTS:
+        synthesizer = type("Synthesizer", (), {"output_sample_rate": 16000})
+    
+    def fake_synthesize(model, text):
+        if text.startswith("Bad"):
+            raise ValueError("bad sentence")
+        return np.full(4, 0.5, dtype=np.float32)
+    
+    monkeypatch.setattr(tts, "_get_tts", lambda model_name=tts.TTS_MODEL_NAME: FakeTTS())
+    monkeypatch.setattr(tts, "_synthesize", fake_synthesize)
+    tts.clear_audio_cache()
+    status = {}
+    
+    pieces = list(tts.stream_tts_audio_iter("Good one. Bad two.", "local", status))
+    
+    assert pieces == [
+        (16000, tts._to_pcm16(np.full(4, 0.5, dtype=np.float32)).tobytes()),
+        (16000, tts._simple_samples_at("Bad two.", 16000).tobytes()),
+    ]
+    assert status == {"fallback": True}
+    assert tts.cached_audio("Good one. Bad two.", "local") is None
+
+def test_cuda_graphs_are_refused_under_autocast_precision():
+    assert tts._use_cuda_graphs("cuda", enabled=True, precision="fp32")
+    assert not tts._use_cuda_graphs("cuda", enabled=True, precision="fp16")
+    assert not tts._use_cuda_graphs("cuda", enabled=True, precision="bf16")
+    assert not tts._use_cuda_graphs("cpu", enabled=True, precision="fp32")
+    assert not tts._use_cuda_graphs("cuda", enabled=False, precision="fp32")
+
+def test_wav_to_opus_resamples_the_fallback_clip():
+    soundfile = pytest.importorskip("soundfile")
+    if "OPUS" not in soundfile.available_subtypes("OGG"):
+        pytest.skip("libsndfile built without Opus")
+    
+    wav = tts.generate_simple_audio("hello world")
+    opus = tts.wav_to_opus(wav)
+    
+    assert opus[:4] == b"OggS"
+    assert len(opus) < len(wav)
+    assert tts.wav_to_opus(b"not audio") is None
@@ -2,6 +2,10 @@ import streamlit as st
 import sys
 import os
 import toml
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 import gc
 
@@ -19,130 +23,127 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# Memory optimization: Configure Streamlit cache
-@st.cache_data(max_entries=10, ttl=300)  # Limit cache entries and set TTL
-def cached_generate_documentation(code):
-    """Cache documentation generation to reduce memory usage"""
-    return code_processor.generate_documentation(code)
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
 
-@st.cache_data(max_entries=5, ttl=600)  # Less cache for audio (heavier)
-def cached_generate_audio(summary, model):
-    """Cache audio generation with strict limits"""
-    return tts.stream_tts_audio_sync(summary, model)
+def _hash_text(text):
+    """Short fixed-size cache key for (possibly large) code strings"""
+    if xxhash is not None:
+        return xxhash.xxh3_64_intdigest(text.encode("utf-8"))
+    return hashlib.blake2b(text.encode(), digest_size=16).digest()
+
+# Memory optimization: Configure Streamlit cache
+@st.cache_data(max_entries=32, ttl=3600, show_spinner=False, hash_funcs={str: _hash_text})
+def cached_generate_summary(code, use_gemini, _client=None):
+    """Cache summary generation to reduce memory usage"""
+    # use_gemini keeps rule-based and Gemini summaries apart; _client itself isn't hashed.
+    # Gemini errors propagate so a rule-based fallback is never cached under use_gemini.
+    return code_processor.generate_summary(code, client=_client, fallback=False)
+
+def generate_summary(code, client=None):
+    """Cached summary, falling back to the rule-based text (uncached) on Gemini errors"""
+    try:
+        return cached_generate_summary(code, client is not None, _client=client)
+    except Exception as e:
+        print(f"Gemini API error: {e}, falling back to rule-based approach")
+        return code_processor.generate_documentation_rule_based(code)["summary"]
+
+# One Gemini client per API key (each bound to that key), reused across reruns and sessions
+@st.cache_resource(show_spinner=False)
+def _gemini_client(api_key):
+    return code_processor.get_client(api_key)
+
+# Full documentation is generated off the script thread while the summary is
+# being spoken; code_processor caches Gemini results itself
+@st.cache_resource
+def _doc_executor():
+    return ThreadPoolExecutor(max_workers=2, thread_name_prefix="docs")
+
+# Generated audio lives in one process-wide LRU, bounded by entries and bytes;
+# session state only keeps its key, so reruns don't copy the WAV bytes around
+AUDIO_STORE_SIZE = 16
+AUDIO_STORE_BYTES = 64 * 1024 * 1024
+
+@st.cache_resource
+def _audio_store():
+    return OrderedDict(), threading.Lock()
+
+def audio_key_for(summary, model):
+    """Key of the stored audio for summary spoken by model"""
+    return hashlib.blake2b(f"{model}\0{summary}".encode(), digest_size=16).hexdigest()
+
+def store_audio(key, audio_data, fallback=False):
+    """Store the WAV for key along with a much smaller Opus copy for the player"""
+    playback = tts.wav_to_opus(audio_data) if audio_data else None
+    store, lock = _audio_store()
+    with lock:
+        store[key] = (audio_data, playback, fallback)
+        store.move_to_end(key)
+        total = sum(len(wav or b"") + len(opus or b"") for wav, opus, _ in store.values())
+        # Always keep the newest entry, even if it alone exceeds the byte budget
+        while len(store) > 1 and (len(store) > AUDIO_STORE_SIZE or total > AUDIO_STORE_BYTES):
+            _, (wav, opus, _) = store.popitem(last=False)
+            total -= len(wav or b"") + len(opus or b"")
+
+def clear_audio_store():
+    store, lock = _audio_store()
+    with lock:
+        store.clear()
+
+def _load_entry(key):
+    store, lock = _audio_store()
+    with lock:
+        if key not in store:
+            return None, None, False
+        store.move_to_end(key)
+        return store[key]
+
+def load_audio(key):
+    """Return stored WAV audio for key, or None if it was never stored or has been evicted"""
+    return _load_entry(key)[0]
+
+def load_playback_audio(key):
+    """Return (audio, format) for the player: Opus when it could be encoded, else the WAV"""
+    audio_data, playback, _ = _load_entry(key)
+    if playback:
+        return playback, 'audio/ogg'
+    return audio_data, 'audio/wav'
+
+def generate_audio(summary, model, placeholder):
+    """Synthesize audio sentence by sentence, reporting progress in placeholder.
+    
+    The clip is kept only in the audio store (the TTS module's own cache is
+    bypassed); its key is returned. Clips with fallback tones are shown but
+    synthesized again next time.
+    """
+    key = audio_key_for(summary, model)
+    audio_data, _, fallback = _load_entry(key)
+    if audio_data is not None and not fallback:
+        return key
+    
+    status = {}
+    pieces = []
+    sample_rate = None
+    for sample_rate, piece in tts.stream_tts_audio_iter(summary, model, status=status, remember=False):
+        pieces.append(piece)
+        placeholder.caption(f"🔊 Synthesized {len(pieces)} sentence(s)...")
+    placeholder.empty()
+    # The WAV is assembled once, when the last sentence is done
+    audio_data = tts.pcm_to_wav(b"".join(pieces), sample_rate) if sample_rate else b""
+    # Limit audio data size to prevent memory issues
+    if len(audio_data) > 5 * 1024 * 1024:  # 5MB limit
+        audio_data = audio_data[:5 * 1024 * 1024]
+    store_audio(key, audio_data, fallback=status.get("fallback", False))
+    return key
 
 # Memory optimization: Clear unused imports
 gc.collect()
 
-# Custom CSS for better UI
-st.markdown("""
-<style>
-    .main-header {
-        text-align: center;
-        padding: 2rem;
-        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-        color: white;
-        border-radius: 15px;
-        margin-bottom: 2rem;
-        box-shadow: 0 4px 15px rgba(102, 126, 234, 0.3);
-    }
-    .main-header h1 {
-        margin: 0;
-        font-size: 2.5rem;
-        font-weight: 700;
-    }
-    .main-header p {
-        margin: 0.5rem 0 0 0;
-        font-size: 1.1rem;
-        opacity: 0.9;
-    }
-    .result-section {
-        background: #f8f9fa;
-        border-radius: 12px;
-        padding: 1.5rem;
-        margin: 1rem 0;
-        border: 1px solid #e1e5e9;
-        box-shadow: 0 2px 8px rgba(0,0,0,0.05);
-    }
-    .result-section h3 {
-        margin: 0 0 1rem 0;
-        color: #2c3e50;
-        font-size: 1.3rem;
-        font-weight: 600;
-    }
-    .documentation {
-        background: white;
-        border: 2px solid #e1e5e9;
-        border-radius: 8px;
-        padding: 1.5rem;
-        font-family: 'Monaco', 'Courier New', monospace;
-        white-space: pre-wrap;
-        max-height: 400px;
-        overflow-y: auto;
-        font-size: 0.95rem;
-        line-height: 1.5;
-        color: #2c3e50;
-    }
-    .stTextArea textarea {
-        border: 2px solid #e1e5e9;
-        border-radius: 8px;
-        font-family: 'Monaco', 'Courier New', monospace;
-        font-size: 0.95rem;
-    }
-    .stTextArea textarea:focus {
-        border-color: #667eea;
-        box-shadow: 0 0 0 3px rgba(102, 126, 234, 0.1);
-    }
-    .stButton > button {
-        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-        color: white;
-        border: none;
-        padding: 0.75rem 2rem;
-        font-size: 1.1rem;
-        font-weight: 600;
-        border-radius: 10px;
-        cursor: pointer;
-        transition: all 0.3s ease;
-        box-shadow: 0 4px 15px rgba(102, 126, 234, 0.3);
-        width: 100%;
-    }
-    .stButton > button:hover {
-        transform: translateY(-2px);
-        box-shadow: 0 8px 25px rgba(102, 126, 234, 0.4);
-    }
-    .stSelectbox > div > div {
-        background: white;
-        border: 2px solid #e1e5e9;
-        border-radius: 8px;
-    }
-    .stSelectbox > div > div:focus {
-        border-color: #667eea;
-    }
-    .sidebar-content {
-        background: #f8f9fa;
-        padding: 1rem;
-        border-radius: 10px;
-        margin: 1rem 0;
-    }
-    .metric-card {
-        background: white;
-        border: 1px solid #e1e5e9;
-        border-radius: 8px;
-        padding: 1rem;
-        margin: 0.5rem 0;
-        text-align: center;
-    }
-    .metric-value {
-        font-size: 1.5rem;
-        font-weight: 700;
-        color: #667eea;
-    }
-    .metric-label {
-        font-size: 0.9rem;
-        color: #6c757d;
-        margin-top: 0.25rem;
-    }
-</style>
-""", unsafe_allow_html=True)
+# Custom CSS for better UI, served from static/ (see .streamlit/config.toml); the
+# link is re-emitted every rerun but the browser fetches the stylesheet only once
+st.markdown('<link rel="stylesheet" href="app/static/streamlit_app.css">', unsafe_allow_html=True)
 
 # Header
 st.markdown("""
@@ -153,10 +154,10 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # Sidebar for settings
-st.sidebar.markdown('<div class="sidebar-content">', unsafe_allow_html=True)
 st.sidebar.header("⚙️ Settings")
 
-# Load configuration from TOML
+# Load configuration from TOML (re-read at most once a minute)
+@st.cache_data(ttl=60, show_spinner=False)
 def load_config():
     config_path = Path(__file__).parent / ".env.toml"
     if config_path.exists():
@@ -165,9 +166,15 @@ def load_config():
 
 config = load_config()
 
+@st.cache_data(ttl=60, show_spinner=False)
+def _api_status():
+    """Environment API key probe, cached so reruns don't re-read os.environ"""
+    gemini_api_key = os.getenv("GEMINI_API_KEY")
+    return {"gemini": bool(gemini_api_key), "gemini_api_key": gemini_api_key}
+
 # Get Gemini API key from config, environment, or user input
 api_config = config.get("api", {})
-gemini_api_key = api_config.get("gemini_api_key") or os.getenv("GEMINI_API_KEY")
+gemini_api_key = api_config.get("gemini_api_key") or _api_status()["gemini_api_key"]
 
 # Allow user to input API key if not available
 if not gemini_api_key:
@@ -201,10 +208,19 @@ st.sidebar.info("🎯 **Tacotron2-DDC**: High-quality TTS by Coqui")
 tts_config = config.get("tts", {})
 model_id = tts_config.get("model", "tts_models/en/ljspeech/tacotron2-DDC")
 
+# Load the TTS model and Gemini client once per process, before the first click
+@st.cache_resource(show_spinner="Loading models...")
+def warm_models(model, api_key):
+    tts.ensure_model_loaded(model)
+    _gemini_client(api_key)
+    return True
+
+warm_models(model_id, gemini_api_key)
+
 # Memory optimization: Clear large session state data periodically
 def cleanup_session_state():
     """Clean up session state to free memory"""
-    keys_to_check = ['audio_data', 'documentation', 'summary']
+    keys_to_check = ['audio_key', 'documentation', 'summary']
     for key in keys_to_check:
         if key in st.session_state and st.session_state[key]:
             # Clear large data objects
@@ -216,8 +232,11 @@ st.sidebar.markdown("---")
 st.sidebar.markdown("### 🧹 Memory Management")
 if st.sidebar.button("�️ Clear Memory", help="Clear all cached data to free memory"):
     cleanup_session_state()
+    # Drop cached documentation and audio
+    st.cache_data.clear()
+    clear_audio_store()
     # Clear all results
-    keys_to_clear = ['results_generated', 'documentation', 'summary', 'audio_data', 'last_code', 'error', 'generate_triggered']
+    keys_to_clear = ['results_generated', 'documentation', 'summary', 'audio_key', 'last_code_hash', 'error', 'generate_triggered']
     for key in keys_to_clear:
         if key in st.session_state:
             del st.session_state[key]
@@ -226,7 +245,7 @@ if st.sidebar.button("�️ Clear Memory", help="Clear all cached data to free
 
 if 'results_generated' in st.session_state:
     doc_length = len(st.session_state.get('documentation', ''))
-    audio_size = len(st.session_state.get('audio_data', b''))
+    audio_size = len(load_audio(st.session_state.get('audio_key')) or b'')
     
     st.sidebar.markdown(f"""
     <div class="metric-card">
@@ -241,41 +260,8 @@ if 'results_generated' in st.session_state:
 else:
     st.sidebar.info("👆 Generate audio to see stats")
 
-st.sidebar.markdown('</div>', unsafe_allow_html=True)
-
-# Main content area
-col1, col2 = st.columns([3, 1])
-
-with col1:
-    st.markdown('<div class="result-section">', unsafe_allow_html=True)
-    st.header("💻 Code Input")
-    code_input = st.text_area(
-        "Enter your Python code:",
-        height=300,
-        placeholder="def hello_world():\n    print('Hello, world!')\n    return 'success'",
-        help="Paste or type your Python code here for analysis and audio generation"
-    )
-    st.markdown('</div>', unsafe_allow_html=True)
-
-with col2:
-    st.markdown('<div class="sidebar-content">', unsafe_allow_html=True)
-    st.header("🚀 Quick Actions")
-    
-    # Generate button with better styling
-    if st.button("🔥 Generate Audio", type="primary", use_container_width=True):
-        if not code_input.strip():
-            st.error("⚠️ Please enter some code first!")
-            st.session_state.error = "Please enter some code first!"
-        else:
-            # Set a flag to trigger generation
-            st.session_state.generate_triggered = True
-    
-    # Quick example code
-    st.markdown("---")
-    st.subheader("📝 Example Code")
-    
-    if st.button("📋 Load Example", use_container_width=True):
-        example_code = """def fibonacci(n):
+# Sample snippet offered by the "Load Example" button
+EXAMPLE_CODE = """def fibonacci(n):
     if n <= 1:
         return n
     return fibonacci(n-1) + fibonacci(n-2)
@@ -283,119 +269,160 @@ with col2:
 # Test the function
 for i in range(5):
     print(f"F({i}) = {fibonacci(i)}")"""
-        st.session_state.example_code = example_code
-    
-    if 'example_code' in st.session_state:
-        st.code(st.session_state.example_code, language='python')
-        if st.button("📤 Use This Code", use_container_width=True):
-            st.session_state.code_to_use = st.session_state.example_code
+
+def _use_example():
+    # Runs as a callback, before the text area is drawn, so its value can be replaced
+    st.session_state.code_input = st.session_state.example_code
+
+# Main content area: loading the example only reruns this fragment
+@st.fragment
+def _input_panel():
+    col1, col2 = st.columns([3, 1])
     
-    st.markdown('</div>', unsafe_allow_html=True)
-
-# Initialize code_input if not defined
-if 'code_input' not in locals():
-    code_input = ""
-
-# Use example code if selected
-if 'code_to_use' in st.session_state:
-    code_input = st.session_state.code_to_use
-    st.session_state.code_to_use = None  # Clear after use
-
-# Results section
-if 'generate_triggered' in st.session_state or ('results_generated' in st.session_state and code_input.strip()):
-    if not code_input.strip():
-        st.error("⚠️ Please enter some code first!")
-    else:
-        # Show loading
-        with st.spinner("🔄 Generating documentation and audio..."):
-            try:
-                # Generate documentation and audio (using cached versions)
-                doc_result = cached_generate_documentation(code_input)
-                audio_data = cached_generate_audio(doc_result["summary"], model_id)
-                
-                # Store results in session state with memory optimization
-                st.session_state.results_generated = True
-                st.session_state.documentation = doc_result["documentation"]
-                st.session_state.summary = doc_result["summary"]
-                # Limit audio data size to prevent memory issues
-                if len(audio_data) > 5 * 1024 * 1024:  # 5MB limit
-                    st.session_state.audio_data = audio_data[:5 * 1024 * 1024]
-                else:
-                    st.session_state.audio_data = audio_data
-                st.session_state.last_code = code_input
-                
-                # Clear any previous errors and triggers
-                if 'error' in st.session_state:
-                    del st.session_state.error
-                if 'generate_triggered' in st.session_state:
-                    del st.session_state.generate_triggered
+    with col1:
+        with st.container(border=True, key="result-section-input"):
+            st.header("💻 Code Input")
+            # Inside a form the text area only reaches the script when Generate
+            # is clicked, so typing doesn't trigger reruns
+            with st.form("code_form", border=False):
+                st.text_area(
+                    "Enter your Python code:",
+                    key="code_input",
+                    height=300,
+                    placeholder="def hello_world():\n    print('Hello, world!')\n    return 'success'",
+                    help="Paste or type your Python code here for analysis and audio generation"
+                )
                 
-                # Force garbage collection
-                gc.collect()
-                    
-            except Exception as e:
-                st.session_state.error = str(e)
-                st.error(f"❌ Error: {e}")
-                if 'generate_triggered' in st.session_state:
-                    del st.session_state.generate_triggered
-
-# Display results
-if 'results_generated' in st.session_state and st.session_state.last_code == code_input:
-    # Documentation section
-    st.markdown('<div class="result-section">', unsafe_allow_html=True)
-    st.subheader("📝 Documentation")
-    st.markdown(f'<div class="documentation">{st.session_state.documentation}</div>', unsafe_allow_html=True)
-    st.markdown('</div>', unsafe_allow_html=True)
+                # Generate button with better styling
+                if st.form_submit_button("🔥 Generate Audio", type="primary", use_container_width=True):
+                    if not st.session_state.get("code_input", "").strip():
+                        st.error("⚠️ Please enter some code first!")
+                        st.session_state.error = "Please enter some code first!"
+                    else:
+                        # Set a flag to trigger generation
+                        st.session_state.generate_triggered = True
+                    # Full rerun so the results panel and sidebar pick up the new state
+                    st.rerun()
     
-    # Summary section
-    st.markdown('<div class="result-section">', unsafe_allow_html=True)
-    st.subheader("📄 Summary")
-    st.info(st.session_state.summary)
-    st.markdown('</div>', unsafe_allow_html=True)
+    with col2:
+        with st.container(border=True, key="sidebar-content-actions"):
+            st.header("🚀 Quick Actions")
+            
+            # Quick example code
+            st.subheader("📝 Example Code")
+            
+            if st.button("📋 Load Example", use_container_width=True):
+                st.session_state.example_code = EXAMPLE_CODE
+            
+            if 'example_code' in st.session_state:
+                st.code(st.session_state.example_code, language='python')
+                st.button("📤 Use This Code", use_container_width=True, on_click=_use_example)
+
+# Results panel: shares state with the input panel through st.session_state
+@st.fragment
+def _results_panel():
+    code_input = st.session_state.get("code_input", "")
+    code_hash = _hash_text(code_input)
     
-    # Audio section
-    st.markdown('<div class="result-section">', unsafe_allow_html=True)
-    st.subheader("🔊 Audio Summary")
+    # Results section: skip regeneration when the shown results are for this exact code
+    needs_update = code_hash != st.session_state.get('last_code_hash')
+    if 'generate_triggered' in st.session_state or ('results_generated' in st.session_state and needs_update and code_input.strip()):
+        if not code_input.strip():
+            st.error("⚠️ Please enter some code first!")
+        else:
+            # Show loading
+            with st.spinner("🔄 Generating documentation and audio..."):
+                try:
+                    # Only the summary is needed to start TTS, so the long
+                    # documentation is generated alongside the audio
+                    client = _gemini_client(gemini_api_key)
+                    summary = generate_summary(code_input, client)
+                    doc_future = _doc_executor().submit(code_processor.generate_full_documentation, code_input, client)
+                    audio_key = generate_audio(summary, model_id, st.empty())
+                    documentation = doc_future.result()
+                    
+                    # Store results in session state with memory optimization
+                    st.session_state.results_generated = True
+                    st.session_state.documentation = documentation
+                    st.session_state.summary = summary
+                    st.session_state.audio_key = audio_key
+                    st.session_state.last_code_hash = code_hash
+                    
+                    # Clear any previous errors and triggers
+                    if 'error' in st.session_state:
+                        del st.session_state.error
+                    if 'generate_triggered' in st.session_state:
+                        del st.session_state.generate_triggered
+                    
+                    # Force garbage collection
+                    gc.collect()
+                        
+                except Exception as e:
+                    st.session_state.error = str(e)
+                    st.error(f"❌ Error: {e}")
+                    if 'generate_triggered' in st.session_state:
+                        del st.session_state.generate_triggered
     
-    # Create audio player
-    if 'audio_data' in st.session_state and st.session_state.audio_data:
-        # Convert bytes to audio file for Streamlit
-        audio_bytes = st.session_state.audio_data
-        st.audio(audio_bytes, format='audio/wav')
+    # Display results
+    if 'results_generated' in st.session_state and st.session_state.get('last_code_hash') == code_hash:
+        # Documentation section
+        with st.container(border=True, key="result-section-documentation"):
+            st.subheader("📝 Documentation")
+            st.markdown(f'<div class="documentation">{st.session_state.documentation}</div>', unsafe_allow_html=True)
+        
+        # Summary section
+        with st.container(border=True, key="result-section-summary"):
+            st.subheader("📄 Summary")
+            st.info(st.session_state.summary)
         
-        # Action buttons
-        col1, col2, col3 = st.columns([1, 1, 1])
-        with col1:
-            st.download_button(
-                label="📥 Download WAV",
-                data=audio_bytes,
-                file_name="code_summary.wav",
-                mime="audio/wav",
-                use_container_width=True
-            )
-        with col2:
-            if st.button("🔄 Regenerate Audio", use_container_width=True):
-                st.session_state.generate_triggered = True
-        with col3:
-            if st.button("🗑️ Clear Results", use_container_width=True):
-                # Clear session state
-                keys_to_clear = ['results_generated', 'documentation', 'summary', 'audio_data', 'last_code']
-                for key in keys_to_clear:
-                    if key in st.session_state:
-                        del st.session_state[key]
-                st.rerun()
-    else:
-        st.warning("🔇 Audio generation failed")
+        # Audio section
+        with st.container(border=True, key="result-section-audio"):
+            st.subheader("🔊 Audio Summary")
+            
+            # Create audio player
+            audio_key = st.session_state.get('audio_key')
+            audio_bytes, audio_format = load_playback_audio(audio_key)
+            if audio_bytes:
+                st.audio(audio_bytes, format=audio_format)
+                
+                # Action buttons
+                col1, col2, col3 = st.columns([1, 1, 1])
+                with col1:
+                    # The WAV is only sent to the browser when the button is clicked
+                    st.download_button(
+                        label="📥 Download WAV",
+                        data=lambda: load_audio(audio_key) or b"",
+                        file_name="code_summary.wav",
+                        mime="audio/wav",
+                        use_container_width=True
+                    )
+                with col2:
+                    if st.button("🔄 Regenerate Audio", use_container_width=True):
+                        st.session_state.generate_triggered = True
+                        # The generation branch above has already run this pass
+                        st.rerun()
+                with col3:
+                    if st.button("🗑️ Clear Results", use_container_width=True):
+                        # Clear session state
+                        keys_to_clear = ['results_generated', 'documentation', 'summary', 'audio_key', 'last_code_hash']
+                        for key in keys_to_clear:
+                            if key in st.session_state:
+                                del st.session_state[key]
+                        st.rerun()
+            else:
+                st.warning("🔇 Audio generation failed")
     
-    st.markdown('</div>', unsafe_allow_html=True)
+    # Error display
+    if 'error' in st.session_state:
+        st.error(f"❌ {st.session_state.error}")
+        if st.button("🔄 Retry"):
+            st.session_state.generate_triggered = True
+            if 'error' in st.session_state:
+                del st.session_state.error
+            st.rerun()
 
-# Error display
-if 'error' in st.session_state:
-    st.error(f"❌ {st.session_state.error}")
-    if st.button("🔄 Retry"):
-        st.session_state.generate_triggered = True
-        if 'error' in st.session_state:
-            del st.session_state.error
+_input_panel()
+_results_panel()
 
 # Footer
 st.markdown("---")
@@ -406,25 +433,34 @@ st.markdown("""
 </div>
 """, unsafe_allow_html=True)
 
+@st.cache_data(ttl=300, show_spinner=False)
+def _system_health_probe():
+    """Run the documentation and TTS pipelines once; repeat clicks within 5 minutes reuse the result"""
+    # Test basic functionality
+    test_code = "print('Hello')"
+    
+    # Test documentation generation
+    doc_result = code_processor.generate_documentation(test_code)
+    
+    # Test TTS
+    audio_data = tts.stream_tts_audio_sync("Test", "simple")
+    
+    return {"doc_chars": len(doc_result["documentation"]), "audio_bytes": len(audio_data)}
+
 # Health check in sidebar
 if st.sidebar.button("🔍 Check System Health"):
     try:
-        # Test basic functionality
-        test_code = "print('Hello')"
-        
-        # Test documentation generation
-        doc_result = code_processor.generate_documentation(test_code)
-        
-        # Test TTS
-        audio_data = tts.stream_tts_audio_sync("Test", "simple")
+        health = _system_health_probe()
         
         # Check if Gemini is available
         gemini_status = "✅ Configured" if gemini_api_key else "🔧 Not configured"
         
         st.sidebar.success("✅ System healthy!")
-        st.sidebar.info(f"📝 Documentation: {len(doc_result['documentation'])} chars")
-        st.sidebar.info(f"🔊 Audio generated: {len(audio_data)} bytes")
-        st.sidebar.info(f"🤖 Gemini API: {gemini_status}")
+        st.sidebar.markdown(
+            f"📝 Documentation: {health['doc_chars']} chars\n\n"
+            f"🔊 Audio generated: {health['audio_bytes']} bytes\n\n"
+            f"🤖 Gemini API: {gemini_status}"
+        )
         
     except Exception as e:
         st.sidebar.error(f"❌ System error: {e}")
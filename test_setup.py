@@ -5,8 +5,10 @@ Test script to verify the Code to Audio System setup
 
 import sys
 import os
-import requests
 import subprocess
+import importlib.metadata
+from urllib.request import urlopen
+from urllib.error import HTTPError, URLError
 from pathlib import Path
 
 def check_python_version():
@@ -18,13 +20,21 @@ def check_python_version():
     print(f"✅ Python version: {version.major}.{version.minor}.{version.micro}")
     return True
 
+def is_installed(dist_name):
+    """Check installed-package metadata (by distribution name) without importing the package"""
+    try:
+        importlib.metadata.distribution(dist_name)
+        return True
+    except importlib.metadata.PackageNotFoundError:
+        return False
+
 def check_dependencies():
     """Check if required dependencies are installed"""
     print("\nChecking dependencies...")
     
     # Required dependencies
     required_deps = [
-        "fastapi", "uvicorn", "requests", "pydantic", 
+        "fastapi", "uvicorn", "pydantic", 
         "python-dotenv"
     ]
     
@@ -36,18 +46,16 @@ def check_dependencies():
     ]
     
     for dep in required_deps:
-        try:
-            __import__(dep)
+        if is_installed(dep):
             print(f"✅ {dep} installed")
-        except ImportError:
+        else:
             print(f"❌ {dep} not installed (required)")
             return False
     
     for dep, description in optional_deps:
-        try:
-            __import__(dep)
+        if is_installed(dep):
             print(f"✅ {dep} installed ({description})")
-        except ImportError:
+        else:
             print(f"⚠️  {dep} not installed ({description}) - optional")
     
     return True
@@ -88,14 +96,18 @@ def test_application_health():
     """Test if the application is running"""
     print("\nTesting application connection...")
     try:
-        response = requests.get("http://localhost:8000/health", timeout=5)
-        if response.status_code == 200:
+        with urlopen("http://localhost:8000/health", timeout=5) as response:
+            status = response.status
+        if status == 200:
             print("✅ Application is running and healthy")
             return True
         else:
-            print(f"❌ Application returned status code: {response.status_code}")
+            print(f"❌ Application returned status code: {status}")
             return False
-    except requests.exceptions.ConnectionError:
+    except HTTPError as e:
+        print(f"❌ Application returned status code: {e.code}")
+        return False
+    except URLError:
         print("❌ Application is not running (connection refused)")
         print("   Start with: python -m uvicorn app:app --reload")
         return False
@@ -107,13 +119,18 @@ def test_web_interface():
     """Test if the web interface is accessible"""
     print("\nTesting web interface...")
     try:
-        response = requests.get("http://localhost:8000/", timeout=5)
-        if response.status_code == 200 and "Code to Audio System" in response.text:
+        with urlopen("http://localhost:8000/", timeout=5) as response:
+            status = response.status
+            body = response.read().decode("utf-8", "replace")
+        if status == 200 and "Code to Audio System" in body:
             print("✅ Web interface is accessible")
             return True
         else:
-            print(f"❌ Web interface not accessible (status: {response.status_code})")
+            print(f"❌ Web interface not accessible (status: {status})")
             return False
+    except HTTPError as e:
+        print(f"❌ Web interface not accessible (status: {e.code})")
+        return False
     except Exception as e:
         print(f"❌ Error accessing web interface: {e}")
         return False